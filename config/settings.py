@@ -3,6 +3,9 @@ Configuration du système AOR (Assistant de Réponse aux Appels d'Offre)
 """
 
 import os
+import functools
+import logging
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional
 from dotenv import load_dotenv
@@ -10,8 +13,11 @@ from dotenv import load_dotenv
 # Charger les variables d'environnement depuis le fichier .env
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True, slots=True)
 class Settings:
-    """Configuration centralisée du système AOR"""
+    """Configuration centralisée du système AOR (lue une seule fois, immuable)"""
     
     # Chemins des dossiers
     KNOWLEDGE_BASE_PATH: str = os.getenv("KNOWLEDGE_BASE_PATH", r"C:\WokSpace\ABase")
@@ -22,16 +28,39 @@ class Settings:
     LLM_MODEL: str = os.getenv("LLM_MODEL", "mistralai/mistral-7b-instruct-v0.3")
     LLM_MAX_TOKENS: int = int(os.getenv("LLM_MAX_TOKENS", "2048"))
     LLM_TEMPERATURE: float = float(os.getenv("LLM_TEMPERATURE", "0.7"))
+    LLM_MAX_WORKERS: int = int(os.getenv("LLM_MAX_WORKERS", "8"))  # Requêtes LLM simultanées
+    LLM_BACKOFF_CAP: float = float(os.getenv("LLM_BACKOFF_CAP", "10"))  # Attente max. entre tentatives (s)
+    LLM_CIRCUIT_THRESHOLD: int = int(os.getenv("LLM_CIRCUIT_THRESHOLD", "5"))  # Échecs consécutifs avant suspension
+    LLM_CIRCUIT_COOLDOWN: float = float(os.getenv("LLM_CIRCUIT_COOLDOWN", "30"))  # Durée de suspension (s)
+    LLM_STREAM: bool = os.getenv("LLM_STREAM", "true").lower() in ("1", "true", "yes")  # Réponses SSE, arrêt dès le JSON complet
+    LLM_CACHE_SIZE: int = int(os.getenv("LLM_CACHE_SIZE", "1024"))  # Réponses gardées en mémoire (LRU)
+    LLM_CACHE_PROMPT: bool = os.getenv("LLM_CACHE_PROMPT", "true").lower() in ("1", "true", "yes")  # Réutilise le cache KV du prompt système
     
     # Configuration Milvus
     MILVUS_HOST: str = os.getenv("MILVUS_HOST", "localhost")
     MILVUS_PORT: int = int(os.getenv("MILVUS_PORT", "19530"))
     MILVUS_COLLECTION_NAME: str = os.getenv("MILVUS_COLLECTION_NAME", "aor_knowledge_base")
     MILVUS_DIMENSION: int = int(os.getenv("MILVUS_DIMENSION", "384"))  # Dimension pour all-MiniLM-L6-v2
+    MILVUS_IVF_INDEX_TYPE: str = os.getenv("MILVUS_IVF_INDEX_TYPE", "IVF_FLAT").upper()  # IVF_FLAT ou IVF_SQ8 (4x moins de mémoire)
+    MILVUS_EMBED_DTYPE: str = os.getenv("MILVUS_EMBED_DTYPE", "float32").lower()  # float32 ou float16 (pymilvus >= 2.4)
+    VECTOR_QUERY_CACHE_SIZE: int = int(os.getenv("VECTOR_QUERY_CACHE_SIZE", "1024"))  # Recherches gardées en mémoire (LRU)
+    VECTOR_INSERT_BATCH: int = int(os.getenv("VECTOR_INSERT_BATCH", "512"))  # Lignes par appel d'insertion Milvus
     
     # Configuration Embedding
     EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
     EMBEDDING_DEVICE: str = os.getenv("EMBEDDING_DEVICE", "cpu")
+    EMBEDDING_BACKEND: str = os.getenv("EMBEDDING_BACKEND", "torch")  # torch, torch_compile, onnxruntime
+    EMBEDDING_DTYPE: str = os.getenv("EMBEDDING_DTYPE", "auto")  # auto (float16 sur CUDA), float32, float16, bfloat16
+    EMBEDDING_BATCH_SIZE: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))  # Textes par passe du modèle
+    EMBEDDING_WORKERS: int = int(os.getenv("EMBEDDING_WORKERS", "1"))  # > 1 : pool multi-processus
+    EMBEDDING_DEVICES: str = os.getenv("EMBEDDING_DEVICES", "")  # Ex. "cuda:0,cuda:1" (vide = EMBEDDING_DEVICE par worker)
+    EMBEDDING_PARALLEL_THRESHOLD: int = int(os.getenv("EMBEDDING_PARALLEL_THRESHOLD", "256"))  # Textes min. pour le pool
+    STORE_NORMALIZED: bool = os.getenv("STORE_NORMALIZED", "true").lower() in ("1", "true", "yes")  # Embeddings de norme 1
+    EMBEDDING_MAX_BATCH_CHARS: int = int(os.getenv("EMBEDDING_MAX_BATCH_CHARS", "150000"))  # Caractères max. par appel d'indexation
+    EMBEDDING_CACHE_SIZE: int = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))  # Embeddings gardés en mémoire (LRU)
+    
+    # Cache disque (vide = désactivé)
+    CACHE_DIR: str = os.getenv("CACHE_DIR", "")
     
     # Configuration de similarité
     SIMILARITY_THRESHOLD: float = float(os.getenv("SIMILARITY_THRESHOLD", "0.8"))
@@ -40,11 +69,12 @@ class Settings:
     # Configuration de chunking
     CHUNK_SIZE: int = int(os.getenv("CHUNK_SIZE", "1000"))
     CHUNK_OVERLAP: int = int(os.getenv("CHUNK_OVERLAP", "200"))
+    INGESTION_WORKERS: int = int(os.getenv("INGESTION_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))  # 1 = extraction séquentielle
     
     # Configuration des fichiers
-    SUPPORTED_EXCEL_EXTENSIONS: list = [".xlsx", ".xls"]
-    SUPPORTED_WORD_EXTENSIONS: list = [".docx", ".doc"]
-    SUPPORTED_EXTENSIONS: list = SUPPORTED_EXCEL_EXTENSIONS + SUPPORTED_WORD_EXTENSIONS
+    SUPPORTED_EXCEL_EXTENSIONS: tuple = (".xlsx", ".xls")
+    SUPPORTED_WORD_EXTENSIONS: tuple = (".docx", ".doc")
+    SUPPORTED_EXTENSIONS: tuple = SUPPORTED_EXCEL_EXTENSIONS + SUPPORTED_WORD_EXTENSIONS
     
     # Configuration des logs
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
@@ -60,12 +90,11 @@ Réponds UNIQUEMENT au format JSON suivant :
     "sources": ["source1", "source2"]
 }"""
 
-    @classmethod
-    def validate_paths(cls) -> bool:
+    def validate_paths(self) -> bool:
         """Valide que les chemins de base existent"""
         paths_to_check = [
-            cls.KNOWLEDGE_BASE_PATH,
-            cls.OUTPUT_PATH
+            self.KNOWLEDGE_BASE_PATH,
+            self.OUTPUT_PATH
         ]
         
         for path in paths_to_check:
@@ -79,25 +108,97 @@ Réponds UNIQUEMENT au format JSON suivant :
         
         return True
     
-    @classmethod
-    def get_knowledge_base_files(cls) -> list:
-        """Récupère la liste des fichiers de la base de connaissances"""
-        files = []
-        if os.path.exists(cls.KNOWLEDGE_BASE_PATH):
-            for root, dirs, filenames in os.walk(cls.KNOWLEDGE_BASE_PATH):
-                for filename in filenames:
-                    file_path = os.path.join(root, filename)
-                    if any(filename.lower().endswith(ext) for ext in cls.SUPPORTED_EXTENSIONS):
-                        files.append(file_path)
-        return files
+    def get_knowledge_base_files(self) -> list:
+        """
+        Récupère la liste des fichiers de la base de connaissances
+        
+        Le résultat est mis en cache tant que la date de modification d'aucun
+        des dossiers parcourus (racine et sous-dossiers) ne change.
+        """
+        cached = _KB_SCAN_CACHE.get(self.KNOWLEDGE_BASE_PATH)
+        if cached is not None and _directories_unchanged(cached[0]):
+            return list(cached[1])
+        
+        try:
+            root_mtime_ns = os.stat(self.KNOWLEDGE_BASE_PATH).st_mtime_ns
+        except OSError:
+            _KB_SCAN_CACHE.pop(self.KNOWLEDGE_BASE_PATH, None)
+            return []
+        dir_mtimes, files = _scan_supported_files(self.KNOWLEDGE_BASE_PATH, root_mtime_ns)
+        _KB_SCAN_CACHE[self.KNOWLEDGE_BASE_PATH] = (dir_mtimes, files)
+        return list(files)
     
-    @classmethod
-    def get_output_file_path(cls, input_file_path: str) -> str:
+    def get_output_file_path(self, input_file_path: str) -> str:
         """Génère le chemin de sortie pour un fichier d'entrée"""
-        input_filename = os.path.basename(input_file_path)
-        name, ext = os.path.splitext(input_filename)
-        output_filename = f"{name}_avec_reponses{ext}"
-        return os.path.join(cls.OUTPUT_PATH, output_filename)
+        return _build_output_file_path(self.OUTPUT_PATH, input_file_path)
+
+@functools.lru_cache(maxsize=128)
+def _build_output_file_path(output_path: str, input_file_path: str) -> str:
+    """
+    Construit (une seule fois par fichier) le chemin de sortie
+    
+    Args:
+        output_path: Dossier de sortie
+        input_file_path: Chemin du fichier d'entrée
+        
+    Returns:
+        Chemin du fichier de sortie
+    """
+    input_filename = os.path.basename(input_file_path)
+    name, ext = os.path.splitext(input_filename)
+    return os.path.join(output_path, f"{name}_avec_reponses{ext}")
+
+# Cache du parcours de la base de connaissances :
+# racine -> (dates de modification des dossiers parcourus, fichiers trouvés)
+_KB_SCAN_CACHE: dict = {}
+
+def _directories_unchanged(dir_mtimes: tuple) -> bool:
+    """
+    Vérifie qu'aucun des dossiers parcourus n'a été modifié depuis le parcours
+    
+    Args:
+        dir_mtimes: Tuple de couples (dossier, date de modification en ns)
+        
+    Returns:
+        True si toutes les dates de modification sont inchangées
+    """
+    try:
+        return all(os.stat(path).st_mtime_ns == mtime_ns for path, mtime_ns in dir_mtimes)
+    except OSError:
+        return False
+
+def _scan_supported_files(root_path: str, root_mtime_ns: int) -> tuple:
+    """
+    Parcourt récursivement un dossier avec os.scandir
+    
+    Args:
+        root_path: Dossier à parcourir
+        root_mtime_ns: Date de modification du dossier racine
+        
+    Returns:
+        Tuple (dates de modification des dossiers parcourus, chemins des fichiers supportés)
+    """
+    files = []
+    dir_mtimes = [(root_path, root_mtime_ns)]
+    stack = [root_path]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                entries = list(it)
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    # Date relevée avant le parcours du sous-dossier : une modification
+                    # pendant le parcours invalidera le cache au prochain appel
+                    dir_mtimes.append((entry.path, entry.stat(follow_symlinks=False).st_mtime_ns))
+                    stack.append(entry.path)
+                elif entry.name.lower().endswith(_SUPPORTED_EXTENSION_TUPLE) and entry.is_file():
+                    files.append(entry.path)
+        except OSError as e:
+            logger.error(f"✗ Erreur lors du parcours du dossier {current}: {e}")
+    return tuple(dir_mtimes), tuple(files)
 
 # Instance globale des paramètres
-settings = Settings() 
\ No newline at end of file
+settings = Settings()
+
+_SUPPORTED_EXTENSION_TUPLE = tuple(ext.lower() for ext in settings.SUPPORTED_EXTENSIONS) 
\ No newline at end of file
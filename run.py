@@ -2,27 +2,25 @@
 """
 Script de lancement pour l'application AOR
 """
-import logging
 import sys
 import os
-sys.stdout.reconfigure(encoding='utf-8')
+
 # Force l'encodage UTF-8 du terminal Windows (Python 3.7+ requis)
 if hasattr(sys.stdout, "reconfigure"):
     sys.stdout.reconfigure(encoding='utf-8')
     sys.stderr.reconfigure(encoding='utf-8')
-# Configuration du logging avec sortie UTF-8
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[logging.StreamHandler(sys.stdout)]
-)
-    
-    
+
 # Ajouter le répertoire src au path Python
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
+from utils.logging_utils import setup_logging
+
 def main():
     """Point d'entrée principal"""
+    # Configuration unique du logging (fichier rotatif + console UTF-8), dans le
+    # seul processus principal : les workers ré-importent ce module sous Windows
+    log_listener = setup_logging('aor.log')
+    
     try:
         # Importer et lancer l'application
         from src.main import main as app_main
@@ -35,6 +33,8 @@ def main():
     except Exception as e:
         print(f"❌ Erreur fatale: {e}")
         sys.exit(1)
+    finally:
+        log_listener.stop()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -5,31 +5,35 @@ Application principale AOR (Assistant de Réponse aux Appels d'Offre)
 import logging
 import sys
 import time
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional
 import os
-
-# Configuration du logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('aor.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
-# Import des services et modèles
+# Import des modèles (les services sont importés à la demande)
 from config.settings import settings
 from models.data_models import QuestionReponse, ProcessingResult, IndexingResult
-from services.embedding_service import EmbeddingService
-from services.llm_service import LLMService
-from services.vector_store_service import VectorStoreService
-from services.excel_service import ExcelService
-from services.file_processor_service import FileProcessorService
 from utils.json_utils import save_json_to_file
 
+def _batched(iterable: Iterable, size: int) -> Iterator[list]:
+    """
+    Découpe un itérable en lots de taille fixe (équivalent d'itertools.batched)
+    
+    Args:
+        iterable: Éléments à découper
+        size: Taille maximale d'un lot
+        
+    Yields:
+        Listes d'au plus `size` éléments
+    """
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
 class AORApplication:
     """
     Application principale AOR qui orchestre tous les services
@@ -44,19 +48,40 @@ class AORApplication:
             logger.error("❌ Erreur de validation des chemins")
             sys.exit(1)
         
-        # Initialiser les services
-        try:
-            self.embedding_service = EmbeddingService()
-            self.llm_service = LLMService()
-            self.vector_store_service = VectorStoreService()
-            self.excel_service = ExcelService()
-            self.file_processor_service = FileProcessorService()
-            
-            logger.info("✓ Tous les services initialisés avec succès")
-            
-        except Exception as e:
-            logger.error(f"❌ Erreur lors de l'initialisation des services: {e}")
-            sys.exit(1)
+        # Les services sont importés et initialisés à la première utilisation
+    
+    @cached_property
+    def embedding_service(self):
+        """Service d'embedding (charge sentence-transformers)"""
+        from services.embedding_service import EmbeddingService
+        return EmbeddingService()
+    
+    @cached_property
+    def llm_service(self):
+        """Service LLM"""
+        from services.llm_service import LLMService
+        return LLMService()
+    
+    @cached_property
+    def vector_store_service(self):
+        """Service de base vectorielle Milvus"""
+        from services.vector_store_service import VectorStoreService
+        return VectorStoreService()
+    
+    @cached_property
+    def excel_service(self):
+        """Service Excel"""
+        from services.excel_service import ExcelService
+        return ExcelService()
+    
+    @cached_property
+    def file_processor_service(self):
+        """Service de traitement des fichiers (réutilise les services d'embedding et Milvus)"""
+        from services.file_processor_service import FileProcessorService
+        return FileProcessorService(
+            embedding_service=self.embedding_service,
+            vector_store_service=self.vector_store_service
+        )
     
     def run(self):
         """Lance l'application principale"""
@@ -161,13 +186,17 @@ class AORApplication:
         """Teste la connexion aux services"""
         print("🔍 Test des services...")
         
-        # Test Milvus
-        if not self.vector_store_service.test_connection():
+        # Tests Milvus et LLM en parallèle (appels réseau indépendants)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            milvus_future = executor.submit(lambda: self.vector_store_service.test_connection())
+            llm_future = executor.submit(lambda: self.llm_service.test_connection())
+            milvus_ok, llm_ok = milvus_future.result(), llm_future.result()
+        
+        if not milvus_ok:
             print("❌ Erreur de connexion à Milvus")
             return False
         
-        # Test LLM
-        if not self.llm_service.test_connection():
+        if not llm_ok:
             print("❌ Erreur de connexion au LLM")
             return False
         
@@ -182,80 +211,108 @@ class AORApplication:
         try:
             logger.info(f"Début du traitement de l'appel d'offre: {file_path}")
             
-            # 1. Extraire les questions
-            questions = self.excel_service.extract_questions_from_excel(file_path)
+            # 1-2. Extraire les questions et générer leurs embeddings par lots,
+            # au fil de la lecture du fichier Excel
+            questions = []
+            question_embeddings = []
+            for batch in _batched(self.excel_service.iter_questions(file_path), settings.EMBEDDING_BATCH_SIZE):
+                question_embeddings.extend(
+                    self.embedding_service.generate_embeddings_batch([q.question for q in batch])
+                )
+                questions.extend(batch)
+            
             if not questions:
                 logger.error("Aucune question extraite du fichier")
                 return None
             
             logger.info(f"✓ {len(questions)} questions extraites")
             
-            # 2. Générer les embeddings pour les questions
-            question_texts = [q.question for q in questions]
-            question_embeddings = self.embedding_service.generate_embeddings_batch(question_texts)
-            
-            # Associer les embeddings aux questions
-            for i, (question, embedding) in enumerate(zip(questions, question_embeddings)):
-                if embedding:
-                    question.question_embedding = embedding
-            
-            logger.info(f"✓ Embeddings générés pour {len([q for q in questions if q.question_embedding])} questions")
-            
-            # 3. Traiter chaque question
+            # Empiler les embeddings valides dans une matrice float32 (N, dim) normalisée
+            embedded_questions = [q for q, emb in zip(questions, question_embeddings) if emb is not None]
+            embedded_count = len(embedded_questions)
+            if embedded_questions:
+                question_matrix = np.asarray(
+                    [emb for emb in question_embeddings if emb is not None], dtype=np.float32
+                )
+                if not settings.STORE_NORMALIZED:
+                    norms = np.linalg.norm(question_matrix, axis=1, keepdims=True)
+                    question_matrix /= np.where(norms == 0, 1.0, norms)
+                
+                # Associer les embeddings aux questions (vues sur les lignes de la matrice)
+                for question, row in zip(embedded_questions, question_matrix):
+                    question.question_embedding = row
+            
+            logger.info(f"✓ Embeddings générés pour {embedded_count} questions")
+            
+            # 3. Rechercher les chunks similaires pour toutes les questions en un seul appel
+            similar_chunks_by_question = [None] * len(questions)
+            if embedded_questions:
+                batch_results = self.vector_store_service.search_similar_chunks_batch(
+                    question_matrix,
+                    limit=settings.MAX_SIMILAR_CHUNKS,
+                    threshold=settings.SIMILARITY_THRESHOLD
+                )
+                position = {id(q): i for i, q in enumerate(questions)}
+                for question, similar_chunks in zip(embedded_questions, batch_results):
+                    similar_chunks_by_question[position[id(question)]] = similar_chunks
+            
+            # 4. Préparer le contexte de chaque question
             questions_with_responses = 0
+            pending = []
             
             for i, question in enumerate(questions):
-                try:
-                    logger.info(f"Traitement de la question {i+1}/{len(questions)}")
-                    
-                    if not question.question_embedding:
-                        logger.warning(f"Question {i+1} sans embedding, ignorée")
-                        continue
-                    
-                    # Rechercher les chunks similaires
-                    similar_chunks = self.vector_store_service.search_similar_chunks(
-                        question.question_embedding,
-                        limit=settings.MAX_SIMILAR_CHUNKS,
-                        threshold=settings.SIMILARITY_THRESHOLD
-                    )
-                    
-                    if not similar_chunks:
-                        logger.warning(f"Aucun chunk similaire trouvé pour la question {i+1}")
-                        continue
-                    
-                    # Préparer le contexte
-                    context_chunks = [result.chunk.content for result in similar_chunks]
-                    question.chunks_utilises = [result.chunk for result in similar_chunks]
-                    
-                    # Générer la réponse
-                    llm_response = self.llm_service.generate_response(
-                        question.question, 
-                        context_chunks
-                    )
-                    
-                    if llm_response:
-                        question.reponse = llm_response.reponse
-                        question.confiance = llm_response.confiance
-                        question.sources = llm_response.sources
-                        questions_with_responses += 1
-                        
-                        logger.info(f"✓ Réponse générée pour la question {i+1} (confiance: {llm_response.confiance:.2f})")
-                    else:
-                        logger.warning(f"Échec de génération de réponse pour la question {i+1}")
+                if question.question_embedding is None:
+                    logger.warning(f"Question {i+1} sans embedding, ignorée")
+                    continue
                 
-                except Exception as e:
-                    error_msg = f"Erreur lors du traitement de la question {i+1}: {e}"
-                    logger.error(error_msg)
-                    errors.append(error_msg)
+                similar_chunks = similar_chunks_by_question[i]
+                
+                if not similar_chunks:
+                    logger.warning(f"Aucun chunk similaire trouvé pour la question {i+1}")
+                    continue
+                
+                # Préparer le contexte
+                chunks = [result.chunk for result in similar_chunks]
+                question.chunks_utilises = chunks
+                context_chunks = [chunk.content for chunk in chunks]
+                pending.append((i, question, context_chunks))
+            
+            # 5. Générer les réponses en parallèle (appels HTTP indépendants)
+            generate_response = self.llm_service.generate_response
             
-            # 4. Sauvegarder les réponses
+            def answer(item):
+                i, question, context_chunks = item
+                try:
+                    return generate_response(question.question, context_chunks), None
+                except Exception as e:
+                    return None, e
+            
+            if pending:
+                max_workers = max(1, min(settings.LLM_MAX_WORKERS, len(pending)))
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    for (i, question, _), (llm_response, error) in zip(pending, executor.map(answer, pending)):
+                        if error is not None:
+                            error_msg = f"Erreur lors du traitement de la question {i+1}: {error}"
+                            logger.error(error_msg)
+                            errors.append(error_msg)
+                        elif llm_response:
+                            question.reponse = llm_response.reponse
+                            question.confiance = llm_response.confiance
+                            question.sources = llm_response.sources
+                            questions_with_responses += 1
+                            
+                            logger.info(f"✓ Réponse générée pour la question {i+1} (confiance: {llm_response.confiance:.2f})")
+                        else:
+                            logger.warning(f"Échec de génération de réponse pour la question {i+1}")
+            
+            # 6. Sauvegarder les réponses
             output_file = self.excel_service.save_responses_to_excel(questions, file_path)
             
             if not output_file:
                 logger.error("Échec de sauvegarde des réponses")
                 return None
             
-            # 5. Sauvegarder les résultats en JSON
+            # 7. Sauvegarder les résultats en JSON
             self._save_results_json(questions, file_path)
             
             temps_traitement = time.time() - start_time
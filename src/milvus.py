@@ -1,8 +1,60 @@
+"""
+Connexion partagée à Milvus
+"""
+
+import functools
+import threading
+
 from pymilvus import connections
 
-try:
-    # Connexion basique
-    connections.connect(alias="default", host="127.0.0.1", port="19530")
-    print("✅ Connexion à Milvus réussie !")
-except Exception as e:
-    print(f"❌ Échec de connexion à Milvus : {e}")
+MILVUS_ALIAS = "default"
+
+# Évite que deux threads ouvrent la connexion en même temps au premier appel
+_CONNECTION_LOCK = threading.Lock()
+
+@functools.lru_cache(maxsize=1)
+def _open_connection(host: str, port: int) -> str:
+    """
+    Ouvre la connexion Milvus partagée (résultat mis en cache)
+
+    Args:
+        host: Hôte Milvus
+        port: Port Milvus
+
+    Returns:
+        Alias de la connexion à utiliser avec pymilvus
+    """
+    connections.connect(alias=MILVUS_ALIAS, host=host, port=port)
+    return MILVUS_ALIAS
+
+def get_connection(host: str, port: int) -> str:
+    """
+    Ouvre (une seule fois) la connexion Milvus partagée
+
+    La connexion vit aussi longtemps que le processus : elle n'est jamais
+    fermée par un service, d'autres composants pouvant encore l'utiliser.
+
+    Args:
+        host: Hôte Milvus
+        port: Port Milvus
+
+    Returns:
+        Alias de la connexion à utiliser avec pymilvus
+    """
+    with _CONNECTION_LOCK:
+        return _open_connection(host, port)
+
+def reset_connection() -> None:
+    """
+    Oublie la connexion en cache pour forcer une reconnexion au prochain appel
+    """
+    with _CONNECTION_LOCK:
+        _open_connection.cache_clear()
+
+if __name__ == "__main__":
+    try:
+        # Connexion basique
+        get_connection("127.0.0.1", 19530)
+        print("✅ Connexion à Milvus réussie !")
+    except Exception as e:
+        print(f"❌ Échec de connexion à Milvus : {e}")
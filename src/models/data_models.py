@@ -1,40 +1,37 @@
 """
-Modèles de données Pydantic pour le système AOR
+Modèles de données pour le système AOR
 """
 
+from dataclasses import dataclass, field
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, Field
 import numpy as np
 
-class Chunk(BaseModel):
+@dataclass(slots=True)
+class Chunk:
     """Modèle représentant un chunk de texte avec ses métadonnées"""
     
-    id: str = Field(..., description="Identifiant unique du chunk")
-    content: str = Field(..., description="Contenu textuel du chunk")
-    source_file: str = Field(..., description="Fichier source du chunk")
-    chunk_index: int = Field(..., description="Index du chunk dans le fichier")
-    embedding: Optional[List[float]] = Field(None, description="Vecteur d'embedding du chunk")
-    metadata: Dict[str, Any] = Field(default_factory=dict, description="Métadonnées supplémentaires")
-    
-    class Config:
-        arbitrary_types_allowed = True
+    id: str  # Identifiant unique du chunk
+    content: str  # Contenu textuel du chunk
+    source_file: str  # Fichier source du chunk
+    chunk_index: int  # Index du chunk dans le fichier
+    embedding: Optional[np.ndarray] = None  # Vecteur d'embedding du chunk (float32)
+    metadata: Dict[str, Any] = field(default_factory=dict)  # Métadonnées supplémentaires
 
-class VectorSearchResult(BaseModel):
+@dataclass(slots=True)
+class VectorSearchResult:
     """Résultat d'une recherche vectorielle"""
     
-    chunk: Chunk = Field(..., description="Chunk trouvé")
-    similarity_score: float = Field(..., description="Score de similarité (0-1)")
-    rank: int = Field(..., description="Rang du résultat")
-    
-    class Config:
-        arbitrary_types_allowed = True
+    chunk: Chunk  # Chunk trouvé
+    similarity_score: float  # Score de similarité (0-1)
+    rank: int  # Rang du résultat
 
 class QuestionReponse(BaseModel):
     """Modèle représentant une question avec sa réponse générée"""
     
     question: str = Field(..., description="Question de l'appel d'offre")
     reponse: Optional[str] = Field(None, description="Réponse générée")
-    question_embedding: Optional[List[float]] = Field(None, description="Vecteur d'embedding de la question")
+    question_embedding: Optional[np.ndarray] = Field(None, description="Vecteur d'embedding de la question (float32)")
     chunks_utilises: List[Chunk] = Field(default_factory=list, description="Chunks utilisés pour la réponse")
     confiance: Optional[float] = Field(None, description="Niveau de confiance de la réponse (0-1)")
     sources: List[str] = Field(default_factory=list, description="Sources utilisées")
@@ -43,15 +40,17 @@ class QuestionReponse(BaseModel):
     class Config:
         arbitrary_types_allowed = True
 
-class LLMResponse(BaseModel):
+@dataclass(slots=True)
+class LLMResponse:
     """Réponse structurée du LLM"""
     
-    reponse: str = Field(..., description="Contenu de la réponse")
-    confiance: float = Field(..., ge=0.0, le=1.0, description="Niveau de confiance")
-    sources: List[str] = Field(default_factory=list, description="Sources utilisées")
+    reponse: str  # Contenu de la réponse
+    confiance: float  # Niveau de confiance (0-1)
+    sources: List[str] = field(default_factory=list)  # Sources utilisées
     
-    class Config:
-        arbitrary_types_allowed = True
+    def __post_init__(self):
+        if not 0.0 <= self.confiance <= 1.0:
+            raise ValueError(f"Niveau de confiance hors de [0, 1]: {self.confiance}")
 
 class ProcessingResult(BaseModel):
     """Résultat du traitement d'un fichier"""
@@ -2,16 +2,35 @@
 Services du système AOR
 """
 
-from .embedding_service import EmbeddingService
-from .llm_service import LLMService
-from .vector_store_service import VectorStoreService
-from .excel_service import ExcelService
-from .file_processor_service import FileProcessorService
+import importlib
+
+# Les services sont importés à la première utilisation : importer un sous-module
+# léger (excel_service par exemple) ne charge ni torch ni pymilvus
+_LAZY_EXPORTS = {
+    "EmbeddingService": ".embedding_service",
+    "EmbeddingIndex": ".embedding_service",
+    "LLMService": ".llm_service",
+    "VectorStoreService": ".vector_store_service",
+    "ExcelService": ".excel_service",
+    "FileProcessorService": ".file_processor_service",
+}
 
 __all__ = [
     "EmbeddingService",
-    "LLMService", 
+    "EmbeddingIndex",
+    "LLMService",
     "VectorStoreService",
     "ExcelService",
     "FileProcessorService"
-] 
\ No newline at end of file
+]
+
+def __getattr__(name: str):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,319 @@
+"""
+Extraction et découpage des fichiers de connaissances
+
+Module volontairement léger (docx, ExcelService et utils uniquement) : il est
+réimporté par chaque processus worker d'ingestion, sans charger torch ni pymilvus.
+"""
+
+import hashlib
+import logging
+import os
+import zlib
+from itertools import chain
+from typing import Iterator, List, Optional, Tuple
+from pathlib import Path
+
+try:
+    from memchunk import Chunker
+except ImportError:  # memchunk est optionnel : découpage en Python pur
+    Chunker = None
+
+try:
+    import zstandard
+except ImportError:  # zstandard est optionnel : compression zlib du cache de texte
+    zstandard = None
+
+from config.settings import settings
+from models.data_models import Chunk
+from utils.file_utils import generate_chunk_id, get_file_size_mb, mapped_file
+from .excel_service import ExcelService
+
+logger = logging.getLogger(__name__)
+
+# Compression du cache de texte extrait (l'extension distingue les formats)
+if zstandard is not None:
+    TEXT_CACHE_SUFFIX = ".zst"
+    _compress = zstandard.ZstdCompressor().compress
+    _decompress = zstandard.ZstdDecompressor().decompress
+else:
+    TEXT_CACHE_SUFFIX = ".zz"
+    _compress = zlib.compress
+    _decompress = zlib.decompress
+
+# Délimiteurs de coupure des chunks (memchunk)
+CHUNK_DELIMITERS = b" \n.?!"
+
+# ExcelService propre à chaque processus worker (créé à la première utilisation)
+_worker_excel_service: Optional[ExcelService] = None
+
+def _extract_and_chunk(file_path: str, chunk_size: int, chunk_overlap: int) -> List[Chunk]:
+    """
+    Extrait le texte d'un fichier puis le découpe en chunks (exécutable dans un processus worker)
+    
+    Args:
+        file_path: Chemin du fichier
+        chunk_size: Taille maximale d'un chunk
+        chunk_overlap: Chevauchement entre chunks
+        
+    Returns:
+        Liste de chunks (vide si aucun contenu)
+    """
+    global _worker_excel_service
+    if _worker_excel_service is None:
+        _worker_excel_service = ExcelService()
+    
+    # Un seul stat() par fichier, partagé par le cache de texte et les métadonnées des chunks
+    try:
+        file_stat = os.stat(file_path)
+    except OSError as e:
+        logger.error(f"Erreur lors de l'accès au fichier {file_path}: {e}")
+        return []
+    
+    text_content = _extract_text(file_path, _worker_excel_service, file_stat)
+    if not text_content:
+        return []
+    return _split_into_chunks(text_content, file_path, chunk_size, chunk_overlap, file_stat)
+
+def _extract_text(file_path: str, excel_service: ExcelService,
+                  file_stat: Optional[os.stat_result] = None) -> str:
+    """
+    Extrait le texte d'un fichier selon son type
+    
+    Si CACHE_DIR est défini, le texte extrait est mémorisé sur disque
+    (compressé) tant que le chemin, la date de modification et la taille
+    du fichier ne changent pas.
+    
+    Args:
+        file_path: Chemin du fichier
+        excel_service: Service Excel utilisé pour les classeurs
+        file_stat: Résultat d'os.stat déjà obtenu pour ce fichier
+        
+    Returns:
+        Texte extrait du fichier
+    """
+    try:
+        cache_path = _text_cache_path(file_path, file_stat)
+        if cache_path is not None and cache_path.exists():
+            logger.info(f"✓ Texte repris du cache pour: {file_path}")
+            return _decompress(cache_path.read_bytes()).decode('utf-8')
+        
+        file_extension = Path(file_path).suffix.lower()
+        
+        if file_extension in settings.SUPPORTED_EXCEL_EXTENSIONS:
+            text = excel_service.extract_text_from_excel(file_path)
+        
+        elif file_extension in settings.SUPPORTED_WORD_EXTENSIONS:
+            text = _extract_word_text(file_path)
+        
+        else:
+            logger.warning(f"Type de fichier non supporté: {file_path}")
+            return ""
+        
+        if text and cache_path is not None:
+            _write_cache_file(cache_path, _compress(text.encode('utf-8')))
+        return text
+    
+    except Exception as e:
+        logger.error(f"Erreur lors de l'extraction du texte de {file_path}: {e}")
+        return ""
+
+def _text_cache_path(file_path: str, file_stat: Optional[os.stat_result] = None) -> Optional[Path]:
+    """
+    Calcule l'emplacement du texte extrait en cache pour une version donnée d'un fichier
+    
+    Args:
+        file_path: Chemin du fichier source
+        file_stat: Résultat d'os.stat déjà obtenu pour ce fichier
+        
+    Returns:
+        Chemin du fichier de cache, ou None si le cache disque est désactivé
+    """
+    if not settings.CACHE_DIR:
+        return None
+    
+    abs_path = os.path.abspath(file_path)
+    stat = file_stat or os.stat(abs_path)
+    key = hashlib.blake2b(f"{abs_path}|{stat.st_mtime_ns}|{stat.st_size}".encode('utf-8'), digest_size=16).hexdigest()
+    return Path(settings.CACHE_DIR) / "text" / key[:2] / f"{key[2:]}{TEXT_CACHE_SUFFIX}"
+
+def _write_cache_file(cache_path: Path, data: bytes) -> None:
+    """
+    Écrit un fichier de cache de manière atomique (fichier temporaire puis renommage)
+    
+    Args:
+        cache_path: Chemin du fichier de cache
+        data: Contenu à écrire
+    """
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.warning(f"⚠️ Impossible d'écrire le cache {cache_path}: {e}")
+
+def _extract_word_text(file_path: str) -> str:
+    """
+    Extrait le texte d'un fichier Word
+    
+    Args:
+        file_path: Chemin du fichier Word
+    
+    Returns:
+        Texte extrait du fichier Word
+    """
+    try:
+        from docx import Document
+        
+        # Le zip est lu directement depuis la projection mémoire du fichier
+        with mapped_file(file_path) as mapped:
+            doc = Document(mapped)
+        
+        # Paragraphes puis lignes de tableaux, chaque texte n'étant calculé et nettoyé qu'une fois
+        paragraphs = (text for text in (p.text.strip() for p in doc.paragraphs) if text)
+        table_rows = (
+            " | ".join([text for text in (cell.text.strip() for cell in row.cells) if text])
+            for table in doc.tables
+            for row in table.rows
+        )
+        
+        full_text = "\n".join(chain(paragraphs, (row_text for row_text in table_rows if row_text)))
+        logger.info(f"✓ Texte extrait du fichier Word: {len(full_text)} caractères")
+        
+        return full_text
+    
+    except Exception as e:
+        logger.error(f"Erreur lors de l'extraction du texte Word: {e}")
+        return ""
+
+def _split_into_chunks(text: str, source_file: str, chunk_size: int, chunk_overlap: int,
+                       file_stat: Optional[os.stat_result] = None) -> List[Chunk]:
+    """
+    Divise un texte en chunks
+    
+    Args:
+        text: Texte à diviser
+        source_file: Fichier source
+        chunk_size: Taille maximale d'un chunk
+        chunk_overlap: Chevauchement entre chunks
+        file_stat: Résultat d'os.stat déjà obtenu pour le fichier source
+        
+    Returns:
+        Liste de chunks
+    """
+    try:
+        # Une seule lecture de la taille du fichier pour tous ses chunks
+        file_size_mb = get_file_size_mb(file_stat or source_file)
+        
+        if not text or len(text.strip()) < chunk_size:
+            # Si le texte est plus petit que la taille de chunk, le traiter comme un seul chunk
+            if text.strip():
+                chunk = Chunk(
+                    id=generate_chunk_id(text, source_file, 0),
+                    content=text.strip(),
+                    source_file=source_file,
+                    chunk_index=0,
+                    embedding=None,  # Sera généré plus tard
+                    metadata={
+                        "file_size_mb": file_size_mb,
+                        "chunk_type": "single"
+                    }
+                )
+                return [chunk]
+            return []
+        
+        chunks = []
+        chunk_index = 0
+        
+        for start, end in _chunk_windows(text, chunk_size, chunk_overlap):
+            # Extraire le chunk
+            chunk_text = text[start:end].strip()
+            
+            if chunk_text:
+                chunk = Chunk(
+                    id=generate_chunk_id(chunk_text, source_file, chunk_index),
+                    content=chunk_text,
+                    source_file=source_file,
+                    chunk_index=chunk_index,
+                    embedding=None,  # Sera généré plus tard
+                    metadata={
+                        "file_size_mb": file_size_mb,
+                        "chunk_type": "split",
+                        "start_char": start,
+                        "end_char": end,
+                        "text_length": len(chunk_text)
+                    }
+                )
+                chunks.append(chunk)
+                chunk_index += 1
+        
+        logger.debug(f"✓ {len(chunks)} chunks créés pour {source_file}")
+        return chunks
+    
+    except Exception as e:
+        logger.error(f"Erreur lors de la création des chunks pour {source_file}: {e}")
+        return []
+
+def _chunk_windows(text: str, chunk_size: int, chunk_overlap: int) -> Iterator[Tuple[int, int]]:
+    """
+    Calcule les fenêtres (début, fin) en caractères des chunks d'un texte
+    
+    Avec memchunk, le découpage aux délimiteurs est fait en code natif sur
+    le texte encodé en UTF-8 ; chaque fenêtre reprend ensuite les
+    chunk_overlap derniers caractères de la précédente. La taille visée est
+    convertie en octets selon le nombre moyen d'octets par caractère du texte,
+    et tout morceau plus long que chunk_size - chunk_overlap caractères est
+    redécoupé, pour que les deux chemins respectent CHUNK_SIZE.
+    
+    Args:
+        text: Texte à découper
+        chunk_size: Taille maximale d'un chunk
+        chunk_overlap: Chevauchement entre chunks
+        
+    Returns:
+        Itérateur de couples (début, fin)
+    """
+    if Chunker is not None:
+        step = max(1, chunk_size - chunk_overlap)
+        data = text.encode('utf-8')
+        byte_size = max(1, round(step * len(data) / max(1, len(text))))
+        char_pos = 0
+        chunker = Chunker(data, size=byte_size, delimiters=CHUNK_DELIMITERS, forward_fallback=True)
+        for byte_start, byte_end in chunker.collect_offsets():
+            # Les coupures tombent sur des délimiteurs ASCII : le décodage est sûr
+            piece_end = char_pos + len(data[byte_start:byte_end].decode('utf-8'))
+            while char_pos < piece_end:
+                end = piece_end
+                if end - char_pos > step:
+                    # Morceau trop long (sans délimiteur ou riche en ASCII) : coupe au
+                    # dernier espace de la fenêtre, sinon coupe franche
+                    end = char_pos + step
+                    last_space = text.rfind(' ', char_pos, end)
+                    if last_space > char_pos:
+                        end = last_space
+                yield max(0, char_pos - chunk_overlap), end
+                char_pos = end
+        return
+    
+    start = 0
+    while start < len(text):
+        # Définir la fin du chunk
+        end = start + chunk_size
+        
+        # Si ce n'est pas le dernier chunk, essayer de couper à un espace
+        if end < len(text):
+            # Chercher le dernier espace dans la fenêtre de chevauchement
+            overlap_start = max(start, end - chunk_overlap)
+            last_space = text.rfind(' ', overlap_start, end)
+            
+            if last_space > start:
+                end = last_space
+        
+        yield start, end
+        
+        # Passer au chunk suivant
+        start = end - chunk_overlap
+        
+        # Éviter les boucles infinies
+        if start >= len(text):
+            break
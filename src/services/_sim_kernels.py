@@ -0,0 +1,48 @@
+"""
+Noyaux de similarité compilés avec Numba (dépendance optionnelle)
+"""
+
+import math
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:  # numba est optionnel : cosine_scores vaut alors None
+    numba = None
+
+if numba is not None:
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def cosine_scores(query: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+        """
+        Calcule les similarités cosinus entre une requête et chaque candidat
+        
+        Args:
+            query: Vecteur de requête float32 (D,)
+            candidates: Matrice des candidats float32 (N, D)
+            
+        Returns:
+            Scores float32 (N,) ; 0 pour les vecteurs nuls
+        """
+        n, d = candidates.shape
+        scores = np.zeros(n, dtype=np.float32)
+        
+        query_norm = 0.0
+        for k in range(d):
+            query_norm += query[k] * query[k]
+        query_norm = math.sqrt(query_norm)
+        if query_norm == 0.0:
+            return scores
+        
+        for i in numba.prange(n):
+            dot = 0.0
+            candidate_norm = 0.0
+            for k in range(d):
+                dot += query[k] * candidates[i, k]
+                candidate_norm += candidates[i, k] * candidates[i, k]
+            if candidate_norm > 0.0:
+                scores[i] = dot / (query_norm * math.sqrt(candidate_norm))
+        
+        return scores
+else:
+    cosine_scores = None
@@ -2,16 +2,152 @@
 Service de génération d'embeddings pour le système AOR
 """
 
+import atexit
+import hashlib
 import logging
-from typing import List, Optional
+import math
+import os
+import shelve
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Tuple, Union
 import numpy as np
 from sentence_transformers import SentenceTransformer
 import torch
 
+try:
+    import simsimd
+except ImportError:  # simsimd est optionnel : repli sur numpy
+    simsimd = None
+
 from config.settings import settings
+from ._sim_kernels import cosine_scores as numba_cosine_scores
 
 logger = logging.getLogger(__name__)
 
+def _rank_matches(scores: np.ndarray, threshold: float, limit: Optional[int] = None) -> np.ndarray:
+    """
+    Sélectionne les positions au-dessus du seuil, triées par score décroissant
+    
+    Avec une limite, seuls les `limit` meilleurs scores sont isolés
+    (np.argpartition, O(N)) puis triés, au lieu de trier tous les candidats.
+    
+    Args:
+        scores: Scores de similarité
+        threshold: Seuil de similarité minimum
+        limit: Nombre maximum de résultats
+        
+    Returns:
+        Positions retenues, par score décroissant
+    """
+    matches = np.flatnonzero(scores >= threshold)
+    if limit is not None and limit < len(matches):
+        if limit <= 0:
+            return matches[:0]
+        matches = matches[np.argpartition(-scores[matches], limit - 1)[:limit]]
+    return matches[np.argsort(-scores[matches], kind='stable')]
+
+class EmbeddingIndex:
+    """
+    Index en mémoire d'embeddings normalisés
+    
+    Les vecteurs sont rangés dans un tampon float32 contigu (N, D) dont la
+    capacité double à chaque dépassement : une recherche est un seul
+    produit matrice-vecteur sur ce tampon.
+    """
+    
+    def __init__(self, dimension: int, initial_capacity: int = 1024):
+        """
+        Initialise un index vide
+        
+        Args:
+            dimension: Dimension des embeddings
+            initial_capacity: Nombre de vecteurs alloués au départ
+        """
+        self.dimension = dimension
+        self._buffer = np.empty((max(1, initial_capacity), dimension), dtype=np.float32)
+        self._size = 0
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    @property
+    def matrix(self) -> np.ndarray:
+        """Vue (N, D) sur les vecteurs indexés"""
+        return self._buffer[:self._size]
+    
+    def _reserve(self, count: int) -> None:
+        """
+        Agrandit le tampon (doublement) pour accueillir `count` vecteurs de plus
+        
+        Args:
+            count: Nombre de vecteurs à ajouter
+        """
+        required = self._size + count
+        if required <= len(self._buffer):
+            return
+        capacity = len(self._buffer)
+        while capacity < required:
+            capacity *= 2
+        buffer = np.empty((capacity, self.dimension), dtype=np.float32)
+        buffer[:self._size] = self._buffer[:self._size]
+        self._buffer = buffer
+    
+    def add(self, embedding: Union[np.ndarray, List[float]]) -> int:
+        """
+        Ajoute un embedding à l'index
+        
+        Args:
+            embedding: Vecteur (D,)
+            
+        Returns:
+            Position du vecteur dans l'index
+        """
+        return int(self.add_batch(np.asarray(embedding, dtype=np.float32)[None, :])[0])
+    
+    def add_batch(self, embeddings: Union[np.ndarray, List[List[float]]]) -> np.ndarray:
+        """
+        Ajoute plusieurs embeddings (normalisés à l'insertion)
+        
+        Args:
+            embeddings: Matrice (N, D) ou liste de vecteurs
+            
+        Returns:
+            Positions des vecteurs ajoutés
+        """
+        vectors = np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dimension)
+        count = len(vectors)
+        self._reserve(count)
+        
+        rows = self._buffer[self._size:self._size + count]
+        rows[:] = vectors
+        norms = np.sqrt(np.einsum('ij,ij->i', rows, rows))
+        rows /= np.where(norms == 0, 1.0, norms)[:, None]
+        
+        positions = np.arange(self._size, self._size + count)
+        self._size += count
+        return positions
+    
+    def search(self, query_embedding: Union[np.ndarray, List[float]], threshold: float = 0.0,
+               limit: Optional[int] = None) -> List[Tuple[int, float]]:
+        """
+        Recherche les vecteurs les plus similaires (cosinus)
+        
+        Args:
+            query_embedding: Embedding de la requête
+            threshold: Seuil de similarité minimum
+            limit: Nombre maximum de résultats
+            
+        Returns:
+            Liste de tuples (position, score) triés par score décroissant
+        """
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query_norm = float(np.sqrt(np.dot(query, query)))
+        if self._size == 0 or query_norm == 0:
+            return []
+        
+        scores = np.clip(self.matrix @ (query / query_norm), 0.0, 1.0)
+        return [(int(i), float(scores[i])) for i in _rank_matches(scores, threshold, limit)]
+
 class EmbeddingService:
     """
     Service pour la génération d'embeddings de texte
@@ -28,18 +164,180 @@ class EmbeddingService:
         """
         self.model_name = model_name or settings.EMBEDDING_MODEL
         self.device = device or settings.EMBEDDING_DEVICE
+        self.batch_size = settings.EMBEDDING_BATCH_SIZE
+        self.normalize = settings.STORE_NORMALIZED
         
         logger.info(f"Initialisation du service d'embedding avec le modèle: {self.model_name}")
         logger.info(f"Device utilisé: {self.device}")
         
         try:
-            self.model = SentenceTransformer(self.model_name, device=self.device)
+            self.backend = (settings.EMBEDDING_BACKEND or 'torch').lower()
+            self.model = self._load_model()
+            if self.backend != 'onnxruntime':
+                self._apply_dtype(settings.EMBEDDING_DTYPE)
+            if self.backend == 'torch_compile':
+                self._compile_model()
+            self.embedding_dim = self._resolve_embedding_dimension()
+            self._warm_up_kernels()
             logger.info("✓ Modèle d'embedding chargé avec succès")
         except Exception as e:
             logger.error(f"✗ Erreur lors du chargement du modèle d'embedding: {e}")
             raise
+        
+        # Pool multi-processus (plusieurs GPU ou cœurs CPU) pour les gros batchs
+        self._pool = None
+        if settings.EMBEDDING_WORKERS > 1:
+            devices = [d.strip() for d in settings.EMBEDDING_DEVICES.split(",") if d.strip()]
+            devices = devices or [self.device] * settings.EMBEDDING_WORKERS
+            try:
+                self._pool = self.model.start_multi_process_pool(target_devices=devices)
+                logger.info(f"Pool d'encodage multi-processus démarré sur: {', '.join(devices)}")
+            except Exception as e:
+                logger.warning(f"⚠️ Pool d'encodage multi-processus indisponible: {e}")
+        
+        # Cache des embeddings par empreinte du texte (LRU en mémoire + disque optionnel)
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._cache_size = settings.EMBEDDING_CACHE_SIZE
+        self._disk_cache = None
+        if settings.CACHE_DIR:
+            try:
+                os.makedirs(settings.CACHE_DIR, exist_ok=True)
+                self._disk_cache = shelve.open(os.path.join(settings.CACHE_DIR, "embeddings"))
+                atexit.register(self._disk_cache.close)
+                logger.info(f"Cache disque des embeddings: {settings.CACHE_DIR}")
+            except Exception as e:
+                logger.warning(f"⚠️ Cache disque des embeddings indisponible: {e}")
+    
+    def _load_model(self) -> SentenceTransformer:
+        """
+        Charge le modèle sentence-transformers avec le backend demandé
+        
+        Le backend ONNX Runtime (fusion Attention/LayerNorm) nécessite
+        sentence-transformers >= 3.2 et onnxruntime ; à défaut, repli sur PyTorch.
+        
+        Returns:
+            Modèle chargé
+        """
+        if self.backend in ('onnx', 'onnxruntime'):
+            try:
+                model = SentenceTransformer(self.model_name, device=self.device, backend='onnx')
+                self.backend = 'onnxruntime'
+                logger.info("Backend d'embedding: ONNX Runtime")
+                return model
+            except Exception as e:
+                logger.warning(f"⚠️ Backend ONNX Runtime indisponible, repli sur PyTorch: {e}")
+                self.backend = 'torch'
+        
+        return SentenceTransformer(self.model_name, device=self.device)
+    
+    def _compile_model(self) -> None:
+        """
+        Compile le transformeur avec torch.compile (fusion de noyaux)
+        
+        La compilation effective a lieu au premier encodage ; en cas
+        d'indisponibilité, le modèle reste en mode eager.
+        """
+        if not hasattr(torch, 'compile'):
+            logger.warning("⚠️ torch.compile indisponible (PyTorch < 2.0), modèle conservé en mode eager")
+            self.backend = 'torch'
+            return
+        
+        try:
+            # CUDA graphs uniquement sur GPU ; formes dynamiques (longueurs de séquence variables)
+            mode = 'reduce-overhead' if str(self.device).startswith('cuda') else 'default'
+            transformer = self.model[0].auto_model
+            if hasattr(transformer, 'compile'):
+                transformer.compile(mode=mode, dynamic=True)  # En place (PyTorch >= 2.2)
+            else:
+                self.model[0].auto_model = torch.compile(transformer, mode=mode, dynamic=True)
+            logger.info(f"Backend d'embedding: torch.compile (mode {mode})")
+        except Exception as e:
+            logger.warning(f"⚠️ torch.compile a échoué, modèle conservé en mode eager: {e}")
+            self.backend = 'torch'
+    
+    def _apply_dtype(self, dtype_name: str) -> None:
+        """
+        Convertit les poids du modèle dans la précision demandée
+        
+        Les embeddings restent renvoyés en float32 par sentence-transformers.
+        
+        Args:
+            dtype_name: 'auto' (float16 sur CUDA, float32 sinon), 'float32', 'float16' ou 'bfloat16'
+        """
+        on_cuda = str(self.device).startswith('cuda')
+        dtype_name = (dtype_name or 'auto').lower()
+        if dtype_name == 'auto':
+            dtype_name = 'float16' if on_cuda else 'float32'
+        
+        if dtype_name == 'float16':
+            if not on_cuda:
+                # Pas de noyaux float16 efficaces sur CPU
+                logger.warning("⚠️ float16 n'est utilisé que sur CUDA, modèle conservé en float32")
+                return
+            self.model.half()
+        elif dtype_name == 'bfloat16':
+            self.model.to(torch.bfloat16)
+        elif dtype_name != 'float32':
+            logger.warning(f"⚠️ Précision d'embedding inconnue: {dtype_name}, modèle conservé en float32")
+            return
+        
+        logger.info(f"Précision du modèle d'embedding: {dtype_name}")
+    
+    def _cache_key(self, cleaned_text: str) -> str:
+        """
+        Calcule la clé de cache d'un texte (le modèle fait partie de la clé)
+        
+        Args:
+            cleaned_text: Texte nettoyé
+            
+        Returns:
+            Empreinte SHA-256 hexadécimale
+        """
+        return hashlib.sha256(
+            f"{self.model_name}\0{int(self.normalize)}\0{cleaned_text}".encode('utf-8')
+        ).hexdigest()
+    
+    def _cache_get(self, key: str) -> Optional[np.ndarray]:
+        """
+        Cherche un embedding dans le cache mémoire puis dans le cache disque
+        
+        Args:
+            key: Clé de cache
+            
+        Returns:
+            Embedding en cache ou None
+        """
+        embedding = self._cache.get(key)
+        if embedding is not None:
+            self._cache.move_to_end(key)
+            return embedding
+        
+        if self._disk_cache is not None:
+            embedding = self._disk_cache.get(key)
+            if embedding is not None:
+                self._cache_put(key, embedding, persist=False)
+        return embedding
     
-    def generate_embedding(self, text: str) -> Optional[List[float]]:
+    def _cache_put(self, key: str, embedding: np.ndarray, persist: bool = True) -> None:
+        """
+        Ajoute un embedding au cache en évinçant le moins récemment utilisé
+        
+        Args:
+            key: Clé de cache
+            embedding: Embedding à mémoriser
+            persist: Écrire aussi dans le cache disque
+        """
+        # Les embeddings mis en cache sont partagés : lecture seule
+        embedding.flags.writeable = False
+        self._cache[key] = embedding
+        self._cache.move_to_end(key)
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        
+        if persist and self._disk_cache is not None:
+            self._disk_cache[key] = embedding
+    
+    def generate_embedding(self, text: str) -> Optional[np.ndarray]:
         """
         Génère un embedding pour un texte donné
         
@@ -47,7 +345,7 @@ class EmbeddingService:
             text: Texte à encoder
             
         Returns:
-            Liste de floats représentant le vecteur d'embedding
+            Vecteur d'embedding float32 (D,)
         """
         try:
             if not text or not text.strip():
@@ -57,28 +355,40 @@ class EmbeddingService:
             # Nettoyer le texte
             cleaned_text = text.strip()
             
+            # Réutiliser un embedding déjà calculé pour ce texte
+            key = self._cache_key(cleaned_text)
+            cached = self._cache_get(key)
+            if cached is not None:
+                return cached
+            
             # Générer l'embedding
-            embedding = self.model.encode(cleaned_text, convert_to_tensor=False)
+            embedding = self.model.encode(
+                cleaned_text, convert_to_tensor=False, normalize_embeddings=self.normalize
+            )
             
-            # Convertir en liste de floats
-            embedding_list = embedding.tolist() if hasattr(embedding, 'tolist') else list(embedding)
+            # Conserver le tampon float32 (sans conversion en liste Python)
+            embedding = np.asarray(embedding, dtype=np.float32)
+            self._cache_put(key, embedding)
             
             logger.debug(f"Embedding généré pour un texte de {len(cleaned_text)} caractères")
-            return embedding_list
+            return embedding
             
         except Exception as e:
             logger.error(f"Erreur lors de la génération d'embedding: {e}")
             return None
     
-    def generate_embeddings_batch(self, texts: List[str]) -> List[Optional[List[float]]]:
+    def generate_embeddings_batch(self, texts: List[str]) -> List[Optional[np.ndarray]]:
         """
         Génère des embeddings pour une liste de textes (optimisé pour le batch)
         
+        Les embeddings encodés ensemble sont des vues sur les lignes d'une
+        même matrice float32 (N, D).
+        
         Args:
             texts: Liste de textes à encoder
             
         Returns:
-            Liste d'embeddings (None pour les textes qui ont échoué)
+            Liste d'embeddings float32 (None pour les textes qui ont échoué)
         """
         try:
             if not texts:
@@ -92,52 +402,189 @@ class EmbeddingService:
                 logger.warning("Aucun texte valide trouvé dans la liste")
                 return [None] * len(texts)
             
-            # Extraire les indices et textes valides
-            indices, cleaned_texts = zip(*valid_texts)
-            
-            # Générer les embeddings en batch
-            embeddings = self.model.encode(cleaned_texts, convert_to_tensor=False)
-            
-            # Créer la liste de résultats
+            # Séparer les textes déjà en cache de ceux à encoder
             results = [None] * len(texts)
-            for i, (original_idx, embedding) in enumerate(zip(indices, embeddings)):
-                results[original_idx] = embedding.tolist() if hasattr(embedding, 'tolist') else list(embedding)
-            
-            logger.info(f"Embeddings générés pour {len(valid_texts)}/{len(texts)} textes")
+            misses = {}  # clé -> (texte nettoyé, indices d'origine)
+            for original_idx, cleaned_text in valid_texts:
+                key = self._cache_key(cleaned_text)
+                cached = self._cache_get(key)
+                if cached is not None:
+                    results[original_idx] = cached
+                elif key in misses:
+                    misses[key][1].append(original_idx)
+                else:
+                    misses[key] = (cleaned_text, [original_idx])
+            
+            if misses:
+                # Générer en batch uniquement les embeddings manquants
+                # (sentence-transformers trie les textes par longueur pour limiter le padding)
+                keys = list(misses)
+                embeddings = self._encode([misses[key][0] for key in keys])
+                
+                # Replacer les résultats (lignes de la matrice) dans l'ordre d'origine
+                for key, embedding in zip(keys, embeddings):
+                    self._cache_put(key, embedding)
+                    for original_idx in misses[key][1]:
+                        results[original_idx] = embedding
+            
+            logger.info(f"Embeddings générés pour {len(valid_texts)}/{len(texts)} textes "
+                        f"({len(valid_texts) - sum(len(m[1]) for m in misses.values())} depuis le cache)")
             return results
             
         except Exception as e:
             logger.error(f"Erreur lors de la génération d'embeddings en batch: {e}")
             return [None] * len(texts)
     
-    def calculate_similarity(self, embedding1: List[float], embedding2: List[float]) -> float:
+    def generate_embeddings_into(self, texts: Iterable[str], out: np.ndarray) -> np.ndarray:
+        """
+        Génère des embeddings directement dans un tampon préalloué
+        
+        Les lignes de `out` peuvent ensuite être partagées (vues) sans copie ;
+        le tampon peut être en float16 pour diviser la mémoire par deux.
+        
+        Args:
+            texts: Textes à encoder (itérable, une ligne de `out` par texte)
+            out: Matrice (N, D) recevant les embeddings
+            
+        Returns:
+            Masque booléen (N,) des lignes effectivement remplies
+        """
+        texts = list(texts)
+        filled = np.zeros(len(texts), dtype=bool)
+        
+        if out.ndim != 2 or out.shape[0] < len(texts) or out.shape[1] != self.embedding_dim:
+            logger.error(f"Tampon d'embeddings incompatible: {out.shape} pour {len(texts)} textes "
+                         f"de dimension {self.embedding_dim}")
+            return filled
+        
+        for i, embedding in enumerate(self.generate_embeddings_batch(texts)):
+            if embedding is not None:
+                out[i] = embedding  # Conversion vers le dtype du tampon à l'écriture
+                filled[i] = True
+        
+        return filled
+    
+    @staticmethod
+    def quantize(embedding: Union[List[float], np.ndarray]) -> Tuple[np.ndarray, float]:
+        """
+        Quantifie un embedding en int8 (quantification symétrique)
+        
+        Args:
+            embedding: Vecteur d'embedding en flottants
+            
+        Returns:
+            Tuple (vecteur int8, échelle) tel que embedding ≈ vecteur * échelle
+        """
+        vec = np.asarray(embedding, dtype=np.float32)
+        max_abs = float(np.max(np.abs(vec))) if vec.size else 0.0
+        scale = max_abs / 127.0 if max_abs > 0 else 1.0
+        return np.round(vec / scale).astype(np.int8), scale
+    
+    @staticmethod
+    def dequantize(quantized: Tuple[np.ndarray, float]) -> np.ndarray:
+        """
+        Reconstruit un embedding float32 à partir de sa forme int8
+        
+        Args:
+            quantized: Tuple (vecteur int8, échelle) produit par quantize()
+            
+        Returns:
+            Vecteur float32 approché
+        """
+        vec, scale = quantized
+        return vec.astype(np.float32) * np.float32(scale)
+    
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Encode une liste de textes, via le pool multi-processus si le volume le justifie
+        
+        Args:
+            texts: Textes nettoyés à encoder
+            
+        Returns:
+            Matrice float32 (N, D)
+        """
+        if self._pool is not None and len(texts) >= settings.EMBEDDING_PARALLEL_THRESHOLD:
+            embeddings = np.asarray(
+                self.model.encode_multi_process(texts, self._pool, batch_size=self.batch_size),
+                dtype=np.float32
+            )
+            if self.normalize:
+                norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+                embeddings /= np.where(norms == 0, 1.0, norms)
+            return embeddings
+        
+        return np.asarray(self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            convert_to_tensor=False,
+            normalize_embeddings=self.normalize,
+            show_progress_bar=False
+        ), dtype=np.float32)
+    
+    def close(self) -> None:
+        """Arrête le pool multi-processus d'encodage s'il est démarré"""
+        pool, self._pool = getattr(self, '_pool', None), None
+        if pool is not None:
+            try:
+                self.model.stop_multi_process_pool(pool)
+            except Exception as e:
+                logger.error(f"✗ Erreur lors de l'arrêt du pool d'encodage: {e}")
+    
+    def __del__(self):
+        """Libère le pool multi-processus"""
+        self.close()
+    
+    def calculate_similarity(self, embedding1: Union[np.ndarray, List[float], Tuple[np.ndarray, float]], 
+                             embedding2: Union[np.ndarray, List[float], Tuple[np.ndarray, float]],
+                             normalized: bool = False) -> float:
         """
         Calcule la similarité cosinus entre deux embeddings
         
+        Les embeddings quantifiés (tuples produits par quantize()) sont comparés
+        directement en arithmétique entière : l'échelle s'annule dans le cosinus.
+        
         Args:
-            embedding1: Premier vecteur d'embedding
-            embedding2: Deuxième vecteur d'embedding
+            embedding1: Premier vecteur d'embedding (ou forme int8)
+            embedding2: Deuxième vecteur d'embedding (ou forme int8)
+            normalized: Les deux vecteurs sont déjà de norme 1 (un seul produit scalaire)
             
         Returns:
             Score de similarité entre 0 et 1
         """
         try:
-            if not embedding1 or not embedding2:
+            if embedding1 is None or embedding2 is None or len(embedding1) == 0 or len(embedding2) == 0:
                 return 0.0
             
-            # Convertir en numpy arrays
-            vec1 = np.array(embedding1)
-            vec2 = np.array(embedding2)
-            
-            # Calculer la similarité cosinus
-            dot_product = np.dot(vec1, vec2)
-            norm1 = np.linalg.norm(vec1)
-            norm2 = np.linalg.norm(vec2)
-            
-            if norm1 == 0 or norm2 == 0:
+            if isinstance(embedding1, tuple) and isinstance(embedding2, tuple):
+                # Vecteurs int8 : produits scalaires entiers (accumulation int32 sans débordement)
+                vec1, vec2 = embedding1[0], embedding2[0]
+                if simsimd is None:
+                    vec1 = vec1.astype(np.int32)
+                    vec2 = vec2.astype(np.int32)
+            else:
+                # Convertir en numpy arrays (sans copie si déjà en float32)
+                vec1 = np.asarray(embedding1, dtype=np.float32)
+                vec2 = np.asarray(embedding2, dtype=np.float32)
+                
+                if normalized:
+                    # Vecteurs normalisés : le cosinus est le produit scalaire
+                    return max(0.0, min(1.0, float(np.dot(vec1, vec2))))
+            
+            if simsimd is not None:
+                # Noyau cosinus SIMD (AVX2/AVX-512/NEON, int8 ou float32), renvoie une distance
+                if not vec1.any() or not vec2.any():
+                    return 0.0
+                return max(0.0, min(1.0, 1.0 - float(simsimd.cosine(vec1, vec2))))
+            
+            # Calculer la similarité cosinus (produits scalaires directs, sans np.linalg.norm)
+            dot_product = float(np.dot(vec1, vec2))
+            squared_norms = float(np.vdot(vec1, vec1)) * float(np.vdot(vec2, vec2))
+            
+            if squared_norms == 0:
                 return 0.0
             
-            similarity = dot_product / (norm1 * norm2)
+            similarity = dot_product / math.sqrt(squared_norms)
             
             # S'assurer que le résultat est entre 0 et 1
             return max(0.0, min(1.0, similarity))
@@ -146,31 +593,80 @@ class EmbeddingService:
             logger.error(f"Erreur lors du calcul de similarité: {e}")
             return 0.0
     
-    def find_most_similar(self, query_embedding: List[float], 
-                         candidate_embeddings: List[List[float]], 
-                         threshold: float = 0.8) -> List[tuple]:
+    def build_index(self, embeddings: Union[np.ndarray, List[np.ndarray]]) -> EmbeddingIndex:
+        """
+        Construit un index en mémoire à partir d'embeddings
+        
+        Args:
+            embeddings: Embeddings à indexer
+            
+        Returns:
+            Index prêt pour find_most_similar
+        """
+        index = EmbeddingIndex(self.embedding_dim, initial_capacity=max(1, len(embeddings)))
+        if len(embeddings):
+            index.add_batch(embeddings)
+        return index
+    
+    def find_most_similar(self, query_embedding: Union[np.ndarray, List[float]], 
+                         candidate_embeddings: Union[EmbeddingIndex, List[np.ndarray], List[List[float]], np.ndarray], 
+                         threshold: float = 0.8, normalized: bool = False,
+                         limit: Optional[int] = None) -> List[tuple]:
         """
         Trouve les embeddings les plus similaires à un embedding de requête
         
+        Les candidats sont empilés dans une matrice float32 (N, D) dont les
+        lignes sont normalisées (sauf si elles le sont déjà) : tous les scores
+        sont obtenus par un seul produit matrice-vecteur.
+        
         Args:
             query_embedding: Embedding de la requête
-            candidate_embeddings: Liste d'embeddings candidats
+            candidate_embeddings: Index, liste d'embeddings candidats ou matrice (N, D)
             threshold: Seuil de similarité minimum
+            normalized: Requête et candidats sont déjà de norme 1
+            limit: Nombre maximum de résultats (sélection partielle des meilleurs)
             
         Returns:
             Liste de tuples (index, score) triés par score décroissant
         """
         try:
-            similarities = []
+            if isinstance(candidate_embeddings, EmbeddingIndex):
+                # Tampon contigu déjà normalisé
+                similarities = candidate_embeddings.search(query_embedding, threshold, limit)
+                logger.debug(f"Trouvé {len(similarities)} embeddings similaires (seuil: {threshold})")
+                return similarities
+            
+            if isinstance(candidate_embeddings, np.ndarray):
+                indices = np.arange(len(candidate_embeddings))
+                candidates = candidate_embeddings.astype(np.float32, copy=False)
+            else:
+                indices = np.array(
+                    [i for i, emb in enumerate(candidate_embeddings) if emb is not None], dtype=np.intp
+                )
+                if indices.size == 0:
+                    return []
+                candidates = np.asarray([candidate_embeddings[i] for i in indices], dtype=np.float32)
+            
+            if candidates.size == 0:
+                return []
+            
+            query = np.asarray(query_embedding, dtype=np.float32)
             
-            for i, candidate_embedding in enumerate(candidate_embeddings):
-                if candidate_embedding is not None:
-                    similarity = self.calculate_similarity(query_embedding, candidate_embedding)
-                    if similarity >= threshold:
-                        similarities.append((i, similarity))
+            if normalized:
+                # Vecteurs déjà normalisés : un seul produit matrice-vecteur
+                scores = candidates @ query
+            else:
+                scores = self._cosine_scores(query, candidates)
+                if scores is None:
+                    return []
             
-            # Trier par score décroissant
-            similarities.sort(key=lambda x: x[1], reverse=True)
+            # Scores bornés entre 0 et 1
+            scores = np.clip(scores, 0.0, 1.0)
+            
+            # Filtrer par seuil puis trier par score décroissant
+            similarities = [
+                (int(indices[i]), float(scores[i])) for i in _rank_matches(scores, threshold, limit)
+            ]
             
             logger.debug(f"Trouvé {len(similarities)} embeddings similaires (seuil: {threshold})")
             return similarities
@@ -179,22 +675,78 @@ class EmbeddingService:
             logger.error(f"Erreur lors de la recherche d'embeddings similaires: {e}")
             return []
     
-    def get_embedding_dimension(self) -> int:
+    def _cosine_scores(self, query: np.ndarray, candidates: np.ndarray) -> Optional[np.ndarray]:
         """
-        Récupère la dimension des embeddings générés par le modèle
+        Calcule les similarités cosinus entre une requête et des candidats quelconques
+        
+        Args:
+            query: Vecteur de requête (D,)
+            candidates: Matrice des candidats (N, D)
+            
+        Returns:
+            Scores (N,) ou None si la requête est nulle
+        """
+        query_norm = float(np.sqrt(np.dot(query, query)))
+        if query_norm == 0:
+            return None
+        
+        if numba_cosine_scores is not None and simsimd is None:
+            # Noyau Numba parallèle : une seule passe, sans matrice normalisée temporaire
+            return numba_cosine_scores(query, np.ascontiguousarray(candidates))
+        
+        candidate_norms = np.sqrt(np.einsum('ij,ij->i', candidates, candidates))
+        
+        if simsimd is not None:
+            # Distances cosinus SIMD entre la requête et tous les candidats
+            distances = np.asarray(simsimd.cdist(query[None, :], candidates, metric='cosine')).ravel()
+            return np.where(candidate_norms == 0, 0.0, 1.0 - distances)
+        
+        # Normaliser les candidats (lignes) et la requête une seule fois,
+        # puis un seul appel BLAS pour tous les scores
+        candidates = candidates / np.where(candidate_norms == 0, 1.0, candidate_norms)[:, None]
+        return candidates @ (query / query_norm)
+    
+    def _resolve_embedding_dimension(self) -> int:
+        """
+        Détermine (une seule fois) la dimension des embeddings du modèle
+        
+        La dimension est lue dans la configuration du modèle, sans passe
+        d'inférence ; à défaut, MILVUS_DIMENSION est utilisée.
         
         Returns:
             Dimension des vecteurs d'embedding
         """
         try:
-            # Générer un embedding de test pour obtenir la dimension
-            test_embedding = self.model.encode("test", convert_to_tensor=False)
-            return len(test_embedding)
+            dimension = self.model.get_sentence_embedding_dimension()
+            if isinstance(dimension, int) and dimension > 0:
+                return dimension
+            logger.warning(f"Dimension d'embedding non déclarée par le modèle, utilisation de {settings.MILVUS_DIMENSION}")
         except Exception as e:
             logger.error(f"Erreur lors de la récupération de la dimension d'embedding: {e}")
-            return settings.MILVUS_DIMENSION
+        return settings.MILVUS_DIMENSION
+    
+    def _warm_up_kernels(self) -> None:
+        """Compile (ou recharge du cache) le noyau Numba dès l'initialisation"""
+        if numba_cosine_scores is None or simsimd is not None:
+            return
+        try:
+            numba_cosine_scores(
+                np.zeros(self.embedding_dim, dtype=np.float32),
+                np.zeros((1, self.embedding_dim), dtype=np.float32)
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Préchauffage du noyau de similarité Numba échoué: {e}")
     
-    def validate_embedding(self, embedding: List[float]) -> bool:
+    def get_embedding_dimension(self) -> int:
+        """
+        Récupère la dimension des embeddings générés par le modèle
+        
+        Returns:
+            Dimension des vecteurs d'embedding
+        """
+        return self.embedding_dim
+    
+    def validate_embedding(self, embedding: Union[List[float], np.ndarray]) -> bool:
         """
         Valide qu'un embedding est correct
         
@@ -205,25 +757,24 @@ class EmbeddingService:
             True si l'embedding est valide, False sinon
         """
         try:
-            if not embedding:
+            if embedding is None:
                 return False
             
-            # Vérifier que c'est une liste de nombres
-            if not all(isinstance(x, (int, float)) for x in embedding):
-                return False
-            
-            # Vérifier qu'il n'y a pas de valeurs NaN ou infinies
-            if any(np.isnan(x) or np.isinf(x) for x in embedding):
-                return False
+            # Vecteur de nombres (les valeurs non numériques lèvent une exception)
+            vector = np.asarray(embedding, dtype=np.float32)
             
             # Vérifier la dimension
-            expected_dim = self.get_embedding_dimension()
-            if len(embedding) != expected_dim:
-                logger.warning(f"Dimension d'embedding incorrecte: {len(embedding)} vs {expected_dim}")
+            if vector.ndim != 1 or vector.size != self.embedding_dim:
+                if vector.size:
+                    logger.warning(f"Dimension d'embedding incorrecte: {vector.size} vs {self.embedding_dim}")
                 return False
             
-            return True
+            # Vérifier qu'il n'y a pas de valeurs NaN ou infinies (une seule passe vectorisée)
+            return bool(np.isfinite(vector).all())
             
+        except (TypeError, ValueError):
+            # Valeurs non numériques
+            return False
         except Exception as e:
             logger.error(f"Erreur lors de la validation d'embedding: {e}")
             return False 
\ No newline at end of file
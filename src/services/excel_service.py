@@ -2,18 +2,56 @@
 Service de traitement des fichiers Excel pour les appels d'offre
 """
 
+import io
 import logging
+import re
+import numpy as np
 import pandas as pd
-from typing import List, Optional, Dict, Any, Tuple
+from openpyxl import load_workbook
+from typing import List, Optional, Dict, Any, Tuple, Iterator
 import os
 from pathlib import Path
 
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:  # python-calamine est optionnel : lecture via openpyxl / pandas
+    CalamineWorkbook = None
+
 from config.settings import settings
 from models.data_models import QuestionReponse, ProcessingResult
-from utils.file_utils import ensure_directory_exists, create_backup_file
+from utils.file_utils import ensure_directory_exists, create_backup_file, mapped_file
 
 logger = logging.getLogger(__name__)
 
+# Au moins une lettre (équivalent vectorisable de str.isalpha sur un caractère)
+ALPHA_RE = re.compile(r'[^\W\d_]')
+
+# Formats lisibles directement par openpyxl (lecture seule, en flux)
+OPENPYXL_EXTENSIONS = ('.xlsx', '.xlsm')
+
+# Mots-clés indiquant une colonne de questions
+KEYWORD_RE = re.compile(
+    r'question|qst|interrogation|demande|requête|sujet|thème|point|item|rubrique',
+    re.IGNORECASE
+)
+
+# Valeurs textuelles considérées comme vides
+EMPTY_VALUES = frozenset({'nan', 'none', 'null', ''})
+
+def _calamine_cell_text(value: Any) -> str:
+    """
+    Convertit une cellule calamine en texte (les nombres entiers sont lus en float)
+    
+    Args:
+        value: Valeur de la cellule
+        
+    Returns:
+        Texte de la cellule, identique à la lecture openpyxl
+    """
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
 class ExcelService:
     """
     Service pour le traitement des fichiers Excel d'appels d'offre
@@ -34,18 +72,38 @@ class ExcelService:
             Liste des questions extraites
         """
         try:
-            logger.info(f"Extraction des questions depuis: {file_path}")
+            questions = list(self.iter_questions(file_path))
+            logger.info(f"✓ {len(questions)} questions extraites du fichier Excel")
+            return questions
             
-            # Lire le fichier Excel
-            excel_file = pd.ExcelFile(file_path)
-            questions = []
+        except Exception as e:
+            logger.error(f"✗ Erreur lors de l'extraction des questions: {e}")
+            return []
+    
+    def iter_questions(self, file_path: str) -> Iterator[QuestionReponse]:
+        """
+        Parcourt les questions d'un fichier Excel au fil de la lecture
+        
+        Les questions sont produites feuille par feuille, ce qui permet de
+        commencer leur traitement avant la fin de la lecture du fichier.
+        
+        Args:
+            file_path: Chemin du fichier Excel
+            
+        Yields:
+            Questions extraites, dans l'ordre des feuilles et des lignes
+        """
+        logger.info(f"Extraction des questions depuis: {file_path}")
+        
+        # Ouvrir le classeur une seule fois ; les feuilles sont lues au fil de l'eau
+        with pd.ExcelFile(file_path) as excel_file:
             
             # Parcourir toutes les feuilles
             for sheet_name in excel_file.sheet_names:
                 logger.debug(f"Traitement de la feuille: {sheet_name}")
                 
-                # Lire la feuille
-                df = pd.read_excel(file_path, sheet_name=sheet_name)
+                # Lire la feuille (sans ré-ouvrir le classeur)
+                df = excel_file.parse(sheet_name)
                 
                 # Chercher les colonnes contenant des questions
                 question_columns = self._find_question_columns(df)
@@ -53,35 +111,26 @@ class ExcelService:
                 for col in question_columns:
                     logger.debug(f"Traitement de la colonne: {col}")
                     
-                    # Extraire les questions non vides
-                    for index, row in df.iterrows():
-                        question_text = str(row[col]).strip()
-                        
-                        if self._is_valid_question(question_text):
-                            # Créer l'objet QuestionReponse
-                            question_obj = QuestionReponse(
-                                question=question_text,
-                                reponse=None,  # Sera rempli plus tard
-                                question_embedding=None,  # Sera généré plus tard
-                                chunks_utilises=[],
-                                confiance=None,
-                                sources=[],
-                                metadata={
-                                    "sheet_name": sheet_name,
-                                    "column_name": col,
-                                    "row_index": index,
-                                    "source_file": file_path
-                                }
-                            )
-                            
-                            questions.append(question_obj)
-            
-            logger.info(f"✓ {len(questions)} questions extraites du fichier Excel")
-            return questions
-            
-        except Exception as e:
-            logger.error(f"✗ Erreur lors de l'extraction des questions: {e}")
-            return []
+                    # Extraire les questions non vides (filtrage vectorisé de la colonne)
+                    texts = df[col].astype(str).str.strip()
+                    valid_texts = texts[self._valid_question_mask(texts)]
+                    
+                    for index, question_text in valid_texts.items():
+                        # Créer l'objet QuestionReponse
+                        yield QuestionReponse(
+                            question=question_text,
+                            reponse=None,  # Sera rempli plus tard
+                            question_embedding=None,  # Sera généré plus tard
+                            chunks_utilises=[],
+                            confiance=None,
+                            sources=[],
+                            metadata={
+                                "sheet_name": sheet_name,
+                                "column_name": col,
+                                "row_index": index,
+                                "source_file": file_path
+                            }
+                        )
     
     def _find_question_columns(self, df: pd.DataFrame) -> List[str]:
         """
@@ -93,37 +142,40 @@ class ExcelService:
         Returns:
             Liste des noms de colonnes contenant des questions
         """
-        question_columns = []
+        # Vérifier en une passe si les noms de colonnes contiennent des mots-clés
+        keyword_mask = df.columns.astype(str).str.contains(KEYWORD_RE, na=False)
         
-        for col in df.columns:
-            col_str = str(col).lower()
-            
-            # Mots-clés indiquant des questions
-            question_keywords = [
-                'question', 'qst', 'interrogation', 'demande', 'requête',
-                'sujet', 'thème', 'point', 'item', 'rubrique'
-            ]
-            
-            # Vérifier si le nom de colonne contient des mots-clés
-            if any(keyword in col_str for keyword in question_keywords):
+        question_columns = []
+        for col, has_keyword in zip(df.columns, keyword_mask):
+            if has_keyword:
                 question_columns.append(col)
                 continue
             
-            # Vérifier le contenu de la colonne
-            non_null_values = df[col].dropna()
-            if len(non_null_values) > 0:
-                # Compter les valeurs qui ressemblent à des questions
-                question_count = 0
-                for value in non_null_values[:10]:  # Vérifier les 10 premières valeurs
-                    if self._is_valid_question(str(value)):
-                        question_count += 1
-                
-                # Si plus de 50% des valeurs sont des questions
-                if question_count / min(len(non_null_values), 10) > 0.5:
+            # Vérifier le contenu de la colonne (10 premières valeurs non nulles)
+            sample = df[col].dropna().head(10)
+            if len(sample) > 0:
+                # Si plus de 50% des valeurs ressemblent à des questions
+                if self._valid_question_mask(sample.astype(str).str.strip()).mean() > 0.5:
                     question_columns.append(col)
         
         return question_columns
     
+    def _valid_question_mask(self, texts: pd.Series) -> pd.Series:
+        """
+        Version vectorisée de _is_valid_question sur une colonne de textes
+        
+        Args:
+            texts: Série de textes déjà convertis en str et nettoyés (strip)
+            
+        Returns:
+            Masque booléen des textes qui sont des questions valides
+        """
+        return (
+            texts.str.len().ge(10)
+            & ~texts.str.lower().isin(EMPTY_VALUES)
+            & texts.str.contains(ALPHA_RE, regex=True)
+        )
+    
     def _is_valid_question(self, text: str) -> bool:
         """
         Vérifie si un texte est une question valide
@@ -134,22 +186,12 @@ class ExcelService:
         Returns:
             True si c'est une question valide, False sinon
         """
-        if not text or text.strip() == '':
-            return False
-        
-        # Ignorer les valeurs NaN, None, etc.
-        if text.lower() in ['nan', 'none', 'null', '']:
-            return False
+        text = text.strip() if text else ''
         
-        # Vérifier la longueur minimale
-        if len(text.strip()) < 10:
+        # Longueur minimale, valeurs vides (NaN, None...) puis au moins une lettre
+        if len(text) < 10 or text.lower() in EMPTY_VALUES:
             return False
-        
-        # Vérifier qu'il contient des caractères alphabétiques
-        if not any(c.isalpha() for c in text):
-            return False
-        
-        return True
+        return ALPHA_RE.search(text) is not None
     
     def save_responses_to_excel(self, questions: List[QuestionReponse], 
                               original_file_path: str) -> Optional[str]:
@@ -175,19 +217,16 @@ class ExcelService:
             # Créer une sauvegarde du fichier original
             backup_path = create_backup_file(original_file_path)
             
-            # Lire le fichier original
-            excel_file = pd.ExcelFile(original_file_path)
+            # Lire toutes les feuilles du fichier original en une seule passe
+            sheets = pd.read_excel(original_file_path, sheet_name=None)
             
             # Créer un writer Excel
             with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
                 
                 # Traiter chaque feuille
-                for sheet_name in excel_file.sheet_names:
+                for sheet_name, df in sheets.items():
                     logger.debug(f"Traitement de la feuille: {sheet_name}")
                     
-                    # Lire la feuille originale
-                    df = pd.read_excel(original_file_path, sheet_name=sheet_name)
-                    
                     # Ajouter les réponses
                     df_with_responses = self._add_responses_to_dataframe(df, questions, sheet_name)
                     
@@ -205,50 +244,67 @@ class ExcelService:
                                   questions: List[QuestionReponse], 
                                   sheet_name: str) -> pd.DataFrame:
         """
-        Ajoute les réponses à un DataFrame
+        Ajoute les réponses à un DataFrame (modifié en place, sans copie)
         
         Args:
-            df: DataFrame original
+            df: DataFrame de la feuille
             questions: Liste des questions avec réponses
             sheet_name: Nom de la feuille
             
         Returns:
             DataFrame avec les réponses ajoutées
         """
-        # Créer une copie du DataFrame
-        df_with_responses = df.copy()
-        
-        # Trouver les questions de cette feuille
-        sheet_questions = [q for q in questions if q.metadata.get("sheet_name") == sheet_name]
-        
-        for question in sheet_questions:
-            row_index = question.metadata.get("row_index")
+        # Trouver les questions de cette feuille, regroupées par colonne
+        questions_by_column: Dict[Any, List[QuestionReponse]] = {}
+        for question in questions:
+            if question.metadata.get("sheet_name") != sheet_name:
+                continue
             column_name = question.metadata.get("column_name")
+            if question.metadata.get("row_index") is not None and column_name in df.columns:
+                questions_by_column.setdefault(column_name, []).append(question)
+        
+        for column_name, column_questions in questions_by_column.items():
+            # Ajouter la réponse dans une nouvelle colonne
+            response_column = f"{column_name}_reponse"
+            self._ensure_object_column(df, response_column)
             
-            if row_index is not None and column_name in df_with_responses.columns:
-                # Ajouter la réponse dans une nouvelle colonne
-                response_column = f"{column_name}_reponse"
-                
-                if response_column not in df_with_responses.columns:
-                    df_with_responses[response_column] = ""
-                
-                if question.reponse:
-                    df_with_responses.at[row_index, response_column] = question.reponse
-                    
-                    # Ajouter des métadonnées si disponibles
-                    if question.confiance is not None:
-                        confidence_column = f"{column_name}_Confiance"
-                        if confidence_column not in df_with_responses.columns:
-                            df_with_responses[confidence_column] = ""
-                        df_with_responses.at[row_index, confidence_column] = question.confiance
-                    
-                    if question.sources:
-                        sources_column = f"{column_name}_Sources"
-                        if sources_column not in df_with_responses.columns:
-                            df_with_responses[sources_column] = ""
-                        df_with_responses.at[row_index, sources_column] = ", ".join(question.sources)
+            answered = [q for q in column_questions if q.reponse]
+            if not answered:
+                continue
+            
+            # Une seule affectation .loc par colonne
+            df.loc[[q.metadata["row_index"] for q in answered], response_column] = \
+                np.array([q.reponse for q in answered], dtype=object)
+            
+            # Ajouter des métadonnées si disponibles
+            with_confidence = [q for q in answered if q.confiance is not None]
+            if with_confidence:
+                confidence_column = f"{column_name}_Confiance"
+                self._ensure_object_column(df, confidence_column)
+                df.loc[[q.metadata["row_index"] for q in with_confidence], confidence_column] = \
+                    np.array([q.confiance for q in with_confidence], dtype=object)
+            
+            with_sources = [q for q in answered if q.sources]
+            if with_sources:
+                sources_column = f"{column_name}_Sources"
+                self._ensure_object_column(df, sources_column)
+                df.loc[[q.metadata["row_index"] for q in with_sources], sources_column] = \
+                    np.array([", ".join(q.sources) for q in with_sources], dtype=object)
+        
+        return df
+    
+    def _ensure_object_column(self, df: pd.DataFrame, column: str) -> None:
+        """
+        Crée (ou convertit) une colonne de type object pouvant recevoir textes et nombres
         
-        return df_with_responses
+        Args:
+            df: DataFrame à modifier en place
+            column: Nom de la colonne
+        """
+        if column not in df.columns:
+            df[column] = pd.Series("", index=df.index, dtype=object)
+        elif df[column].dtype != object:
+            df[column] = df[column].astype(object)
     
     def extract_text_from_excel(self, file_path: str) -> str:
         """
@@ -263,28 +319,15 @@ class ExcelService:
         try:
             logger.info(f"Extraction du texte depuis: {file_path}")
             
-            excel_file = pd.ExcelFile(file_path)
-            all_text = []
-            
-            for sheet_name in excel_file.sheet_names:
-                df = pd.read_excel(file_path, sheet_name=sheet_name)
-                
-                # Ajouter le nom de la feuille
-                all_text.append(f"=== Feuille: {sheet_name} ===")
-                
-                # Ajouter les en-têtes
-                headers = " | ".join([str(col) for col in df.columns])
-                all_text.append(f"En-têtes: {headers}")
-                
-                # Ajouter le contenu
-                for index, row in df.iterrows():
-                    row_text = " | ".join([str(val) for val in row.values if pd.notna(val)])
-                    if row_text.strip():
-                        all_text.append(row_text)
-                
-                all_text.append("")  # Ligne vide entre les feuilles
+            if CalamineWorkbook is not None:
+                # Lecteur natif (Rust) : tous les formats, sans DataFrame intermédiaire
+                full_text = self._extract_text_calamine(file_path)
+            elif file_path.lower().endswith(OPENPYXL_EXTENSIONS):
+                # Lecture en flux (read_only) : pas de DataFrame intermédiaire
+                full_text = self._extract_text_read_only(file_path)
+            else:
+                full_text = "\n".join(self._extract_text_with_pandas(file_path))
             
-            full_text = "\n".join(all_text)
             logger.info(f"✓ Texte extrait: {len(full_text)} caractères")
             
             return full_text
@@ -293,6 +336,131 @@ class ExcelService:
             logger.error(f"✗ Erreur lors de l'extraction du texte: {e}")
             return ""
     
+    def _extract_text_calamine(self, file_path: str) -> str:
+        """
+        Extrait le texte d'un classeur avec python-calamine (.xlsx, .xlsm, .xls)
+        
+        Même format de sortie que _extract_text_read_only ; les cellules vides
+        (chaînes vides pour calamine) sont ignorées.
+        
+        Args:
+            file_path: Chemin du fichier Excel
+            
+        Returns:
+            Texte extrait (feuilles, en-têtes et contenu)
+        """
+        buffer = io.StringIO()
+        workbook = CalamineWorkbook.from_path(file_path)
+        try:
+            for sheet_index, sheet_name in enumerate(workbook.sheet_names):
+                if sheet_index:
+                    buffer.write("\n")  # Ligne vide entre les feuilles
+                
+                # Ajouter le nom de la feuille
+                buffer.write(f"=== Feuille: {sheet_name} ===\n")
+                
+                rows = iter(workbook.get_sheet_by_name(sheet_name).iter_rows())
+                
+                # Ajouter les en-têtes (même nommage que pandas pour les cellules vides)
+                header = next(rows, ())
+                headers = " | ".join([
+                    _calamine_cell_text(value) if value != "" else f"Unnamed: {i}" for i, value in enumerate(header)
+                ])
+                buffer.write(f"En-têtes: {headers}\n")
+                
+                # Ajouter le contenu : cellules non vides jointes ligne par ligne
+                for row in rows:
+                    parts = [_calamine_cell_text(value) for value in row if value != ""]
+                    if parts:
+                        row_text = " | ".join(parts)
+                        if row_text.strip():
+                            buffer.write(row_text)
+                            buffer.write("\n")
+        finally:
+            workbook.close()
+        
+        return buffer.getvalue()
+    
+    def _extract_text_read_only(self, file_path: str) -> str:
+        """
+        Extrait le texte d'un classeur .xlsx ouvert en lecture seule
+        
+        Les lignes sont écrites au fil de la lecture dans un tampon texte,
+        sans liste intermédiaire.
+        
+        Args:
+            file_path: Chemin du fichier Excel
+            
+        Returns:
+            Texte extrait (feuilles, en-têtes et contenu)
+        """
+        buffer = io.StringIO()
+        # Le classeur (zip) est lu depuis la projection mémoire du fichier
+        with mapped_file(file_path) as mapped:
+            workbook = load_workbook(mapped, read_only=True, data_only=True)
+            try:
+                for sheet_index, worksheet in enumerate(workbook.worksheets):
+                    if sheet_index:
+                        buffer.write("\n")  # Ligne vide entre les feuilles
+                    
+                    # Ajouter le nom de la feuille
+                    buffer.write(f"=== Feuille: {worksheet.title} ===\n")
+                    
+                    rows = worksheet.iter_rows(values_only=True)
+                    
+                    # Ajouter les en-têtes (même nommage que pandas pour les cellules vides)
+                    header = next(rows, ())
+                    headers = " | ".join([
+                        str(value) if value is not None else f"Unnamed: {i}" for i, value in enumerate(header)
+                    ])
+                    buffer.write(f"En-têtes: {headers}\n")
+                    
+                    # Ajouter le contenu : cellules non vides jointes ligne par ligne
+                    for row in rows:
+                        parts = [str(value) for value in row if value is not None]
+                        if parts:
+                            row_text = " | ".join(parts)
+                            if row_text.strip():
+                                buffer.write(row_text)
+                                buffer.write("\n")
+            finally:
+                workbook.close()
+        
+        return buffer.getvalue()
+    
+    def _extract_text_with_pandas(self, file_path: str) -> List[str]:
+        """
+        Extrait les lignes de texte d'un classeur via pandas (formats .xls)
+        
+        Args:
+            file_path: Chemin du fichier Excel
+            
+        Returns:
+            Lignes de texte (feuilles, en-têtes et contenu)
+        """
+        # Lire toutes les feuilles en une seule passe
+        sheets = pd.read_excel(file_path, sheet_name=None)
+        all_text = []
+        
+        for sheet_name, df in sheets.items():
+            # Ajouter le nom de la feuille
+            all_text.append(f"=== Feuille: {sheet_name} ===")
+            
+            # Ajouter les en-têtes
+            headers = " | ".join([str(col) for col in df.columns])
+            all_text.append(f"En-têtes: {headers}")
+            
+            # Ajouter le contenu : cellules non vides jointes ligne par ligne
+            cells = df.stack()
+            cells = cells[cells.notna()].astype(str)
+            if not cells.empty:
+                row_texts = cells.groupby(level=0, sort=False).agg(" | ".join)
+                all_text.extend(row_texts[row_texts.str.strip() != ""].tolist())
+            
+            all_text.append("")  # Ligne vide entre les feuilles
+        
+        return all_text
+    
     def validate_excel_file(self, file_path: str) -> bool:
         """
         Valide qu'un fichier Excel peut être traité
@@ -313,10 +481,16 @@ class ExcelService:
                 logger.error(f"Extension de fichier non supportée: {file_path}")
                 return False
             
-            # Tester la lecture du fichier
-            excel_file = pd.ExcelFile(file_path)
+            # Tester la lecture du fichier (noms de feuilles uniquement)
+            if file_path.lower().endswith(OPENPYXL_EXTENSIONS):
+                workbook = load_workbook(file_path, read_only=True, data_only=True)
+                sheet_names = workbook.sheetnames
+                workbook.close()
+            else:
+                with pd.ExcelFile(file_path) as excel_file:
+                    sheet_names = excel_file.sheet_names
             
-            if len(excel_file.sheet_names) == 0:
+            if len(sheet_names) == 0:
                 logger.error(f"Aucune feuille trouvée dans: {file_path}")
                 return False
             
@@ -4,28 +4,50 @@ Service de traitement des fichiers de connaissances pour l'indexation
 
 import logging
 import os
-from typing import List, Optional, Dict, Any
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, List, Optional, Dict, Any, Tuple
 import re
 from pathlib import Path
+import numpy as np
+
 from .vector_store_service import VectorStoreService # ✅ Ajouter si pas déjà présent
 from config.settings import settings
 from models.data_models import Chunk, IndexingResult
-from utils.file_utils import generate_chunk_id, is_supported_file, get_file_size_mb
+from utils.file_utils import is_supported_file
+from utils.logging_utils import get_log_queue, worker_logging_initializer
 from .excel_service import ExcelService
+from ._file_extraction import _extract_and_chunk, _extract_text, _extract_word_text, _split_into_chunks
 
 logger = logging.getLogger(__name__)
 from .embedding_service import EmbeddingService  # ✅ Ajouter si pas déjà présent
+
+# Nombre maximal de chunks envoyés en un appel au service d'embedding
+MAX_CHUNKS_PER_BATCH = 4096
+
+# Extensions reconnues par get_processing_stats
+EXCEL_EXTENSIONS = frozenset({'.xlsx', '.xls'})
+WORD_EXTENSIONS = frozenset({'.docx', '.doc'})
+SUPPORTED_EXTENSIONS = frozenset(ext.lower() for ext in settings.SUPPORTED_EXTENSIONS)
+
 class FileProcessorService:
     """
     Service pour le traitement des fichiers de connaissances
     """
     
-    def __init__(self):
-        """Initialise le service de traitement de fichiers"""
+    def __init__(self, embedding_service: Optional[EmbeddingService] = None,
+                 vector_store_service: Optional[VectorStoreService] = None):
+        """
+        Initialise le service de traitement de fichiers
+        
+        Args:
+            embedding_service: Service d'embedding à réutiliser (créé sinon)
+            vector_store_service: Service Milvus à réutiliser (créé sinon)
+        """
         self.excel_service = ExcelService()
         self.chunk_size = settings.CHUNK_SIZE
-        self.embedding_service = EmbeddingService()  # ✅ Ajouter cette ligne
-        self.vector_store_service = VectorStoreService()  # ✅ AJOUTER cette ligne
+        self.embedding_service = embedding_service or EmbeddingService()
+        self.vector_store_service = vector_store_service or VectorStoreService()
         self.chunk_overlap = settings.CHUNK_OVERLAP
         
         logger.info("Initialisation du service de traitement de fichiers")
@@ -59,52 +81,41 @@ class FileProcessorService:
             
             logger.info(f"Traitement de {len(files)} fichiers de connaissances")
             
-            for file_path in files:
-                try:
-                    logger.info(f"Traitement du fichier: {file_path}")
-                    
-                    # Extraire le texte du fichier
-                    text_content = self._extract_text_from_file(file_path)
-                    
-                    if not text_content:
-                        logger.warning(f"Aucun contenu extrait du fichier: {file_path}")
-                        continue
-                    
-                    # Diviser en chunks
-                    chunks = self._create_chunks(text_content, file_path)
-                    
-                    '''if chunks:
-                        total_chunks += len(chunks)
-                        files_processed += 1
-                        logger.info(f"✓ {len(chunks)} chunks créés pour {file_path}")
-                        '''
-                    if chunks:
-                    # Générer les embeddings
-                        contents = [chunk.content for chunk in chunks]
-                        embeddings = self.embedding_service.generate_embeddings_batch(contents)
-    
-                        for chunk, emb in zip(chunks, embeddings):
-                            chunk.embedding = emb
-    
-                    # Filtrer les chunks valides
-                        valid_chunks = [chunk for chunk in chunks if chunk.embedding is not None]
-                        logger.info(f"✓ {len(valid_chunks)} / {len(chunks)} chunks avec embeddings valides")
-    
-                     # Insérer dans la base vectorielle
-                        inserted = self.vector_store_service.insert_chunks(valid_chunks)
-                        total_vectors += inserted
-    
-                        total_chunks += len(chunks)
-                        files_processed += 1
-                        logger.info(f"✓ {inserted} vecteurs insérés pour {file_path}")
-                    #w houni rja3na lel code l 9dim
-                    else:
-                        logger.warning(f"Aucun chunk créé pour {file_path}")
-                    
-                except Exception as e:
-                    error_msg = f"Erreur lors du traitement de {file_path}: {e}"
-                    logger.error(error_msg)
-                    errors.append(error_msg)
+            # Passe 1 : extraction et découpage (en parallèle si plusieurs workers)
+            file_chunks: List[Tuple[str, List[Chunk]]] = []
+            for file_path, chunks, error_msg in self._iter_file_chunks(files):
+                if chunks:
+                    file_chunks.append((file_path, chunks))
+                    continue
+                if error_msg is None:
+                    error_msg = f"Aucun chunk créé pour {file_path}"
+                    logger.warning(error_msg)
+                errors.append(error_msg)
+            
+            # Passe 2 : embeddings de tous les fichiers en quelques gros batchs
+            self._embed_chunks([chunk for _, chunks in file_chunks for chunk in chunks])
+            
+            # Passe 3 : insertion de tous les chunks valides dans la base vectorielle
+            all_valid_chunks: List[Chunk] = []
+            for file_path, chunks in file_chunks:
+                valid_chunks = [chunk for chunk in chunks if chunk.embedding is not None]
+                logger.info(f"✓ {len(valid_chunks)} / {len(chunks)} chunks avec embeddings valides pour {file_path}")
+                all_valid_chunks.extend(valid_chunks)
+                total_chunks += len(chunks)
+                files_processed += 1
+            
+            total_vectors = self.vector_store_service.insert_chunks(all_valid_chunks)
+            if total_vectors < len(all_valid_chunks):
+                error_msg = f"Seulement {total_vectors} / {len(all_valid_chunks)} vecteurs insérés"
+                logger.error(error_msg)
+                errors.append(error_msg)
+            else:
+                logger.info(f"✓ {total_vectors} vecteurs insérés")
+            
+            # Persister l'ingestion en un seul flush puis adapter l'index au nouveau volume
+            if total_vectors:
+                self.vector_store_service.flush()
+                self.vector_store_service.rebuild_index()
             
             temps_indexation = time.time() - start_time
             
@@ -129,6 +140,107 @@ class FileProcessorService:
                 erreurs=errors + [error_msg]
             )
     
+    def _embed_chunks(self, chunks: List[Chunk]) -> None:
+        """
+        Génère les embeddings des chunks en batchs plafonnés (nombre de chunks et de caractères)
+        
+        Si un batch échoue entièrement (mémoire insuffisante par exemple),
+        il est rejoué fichier par fichier.
+        
+        Args:
+            chunks: Chunks à compléter (embedding renseigné en place)
+        """
+        max_chars = settings.EMBEDDING_MAX_BATCH_CHARS
+        batch: List[Chunk] = []
+        batch_chars = 0
+        
+        for chunk in chunks:
+            if batch and (len(batch) >= MAX_CHUNKS_PER_BATCH or batch_chars + len(chunk.content) > max_chars):
+                self._embed_batch(batch)
+                batch, batch_chars = [], 0
+            batch.append(chunk)
+            batch_chars += len(chunk.content)
+        
+        if batch:
+            self._embed_batch(batch)
+    
+    def _embed_batch(self, batch: List[Chunk]) -> None:
+        """
+        Génère les embeddings d'un batch, avec repli par fichier en cas d'échec complet
+        
+        Args:
+            batch: Chunks du batch
+        """
+        # Un seul tampon pour tout le batch : chaque chunk en référence une ligne
+        out = np.empty((len(batch), self.embedding_service.get_embedding_dimension()), dtype=np.float32)
+        filled = self.embedding_service.generate_embeddings_into((chunk.content for chunk in batch), out)
+        
+        if not filled.any():
+            sources = {chunk.source_file for chunk in batch}
+            if len(sources) > 1:
+                logger.warning(f"Échec du batch de {len(batch)} chunks, repli fichier par fichier")
+                for source in sources:
+                    self._embed_batch([chunk for chunk in batch if chunk.source_file == source])
+            return
+        
+        for i in np.flatnonzero(filled):
+            batch[i].embedding = out[i]
+    
+    def _iter_file_chunks(self, files: List[str]) -> Iterator[Tuple[str, List[Chunk], Optional[str]]]:
+        """
+        Extrait et découpe les fichiers, dans un pool de processus si INGESTION_WORKERS > 1
+        
+        Si le pool est interrompu (worker tué faute de mémoire par exemple),
+        les fichiers restants sont traités séquentiellement.
+        
+        Args:
+            files: Chemins des fichiers à traiter
+            
+        Returns:
+            Itérateur de triplets (fichier, chunks, message d'erreur ou None) dans l'ordre des fichiers
+        """
+        workers = min(max(1, settings.INGESTION_WORKERS), len(files))
+        remaining = files
+        
+        if workers > 1:
+            logger.info(f"Extraction parallèle avec {workers} processus")
+            remaining = []
+            # Les workers envoient leurs logs au listener du processus principal
+            with ProcessPoolExecutor(max_workers=workers, initializer=worker_logging_initializer,
+                                     initargs=(get_log_queue(), logging.getLogger().getEffectiveLevel())) as pool:
+                futures = [
+                    pool.submit(_extract_and_chunk, file_path, self.chunk_size, self.chunk_overlap)
+                    for file_path in files
+                ]
+                for index, (file_path, future) in enumerate(zip(files, futures)):
+                    try:
+                        result = (file_path, future.result(), None)
+                    except BrokenProcessPool as e:
+                        remaining = files[index:]
+                        logger.error(f"✗ Pool d'extraction interrompu ({e}), repli séquentiel pour {len(remaining)} fichiers")
+                        break
+                    except Exception as e:
+                        error_msg = f"Erreur lors du traitement de {file_path}: {e}"
+                        logger.error(error_msg)
+                        result = (file_path, [], error_msg)
+                    yield result
+        
+        for file_path in remaining:
+            try:
+                text_content = self._extract_text_from_file(file_path)
+                if not text_content:
+                    error_msg = f"Aucun contenu extrait du fichier: {file_path}"
+                    logger.warning(error_msg)
+                    yield file_path, [], error_msg
+                    continue
+                chunks = self._create_chunks(text_content, file_path)
+            except Exception as e:
+                error_msg = f"Erreur lors du traitement de {file_path}: {e}"
+                logger.error(error_msg)
+                yield file_path, [], error_msg
+                continue
+            yield file_path, chunks, None
+    
     def _extract_text_from_file(self, file_path: str) -> str:
         """
         Extrait le texte d'un fichier selon son type
@@ -139,22 +251,7 @@ class FileProcessorService:
         Returns:
             Texte extrait du fichier
         """
-        try:
-            file_extension = Path(file_path).suffix.lower()
-            
-            if file_extension in settings.SUPPORTED_EXCEL_EXTENSIONS:
-                return self.excel_service.extract_text_from_excel(file_path)
-            
-            elif file_extension in settings.SUPPORTED_WORD_EXTENSIONS:
-                return self._extract_text_from_word(file_path)
-            
-            else:
-                logger.warning(f"Type de fichier non supporté: {file_path}")
-                return ""
-                
-        except Exception as e:
-            logger.error(f"Erreur lors de l'extraction du texte de {file_path}: {e}")
-            return ""
+        return _extract_text(file_path, self.excel_service)
     
     def _extract_text_from_word(self, file_path: str) -> str:
         """
@@ -166,35 +263,7 @@ class FileProcessorService:
         Returns:
             Texte extrait du fichier Word
         """
-        try:
-            from docx import Document
-            
-            doc = Document(file_path)
-            text_parts = []
-            
-            # Extraire le texte des paragraphes
-            for paragraph in doc.paragraphs:
-                if paragraph.text.strip():
-                    text_parts.append(paragraph.text.strip())
-            
-            # Extraire le texte des tableaux
-            for table in doc.tables:
-                for row in table.rows:
-                    row_text = []
-                    for cell in row.cells:
-                        if cell.text.strip():
-                            row_text.append(cell.text.strip())
-                    if row_text:
-                        text_parts.append(" | ".join(row_text))
-            
-            full_text = "\n".join(text_parts)
-            logger.info(f"✓ Texte extrait du fichier Word: {len(full_text)} caractères")
-            
-            return full_text
-            
-        except Exception as e:
-            logger.error(f"Erreur lors de l'extraction du texte Word: {e}")
-            return ""
+        return _extract_word_text(file_path)
     
     def _create_chunks(self, text: str, source_file: str) -> List[Chunk]:
         """
@@ -207,75 +276,7 @@ class FileProcessorService:
         Returns:
             Liste de chunks
         """
-        try:
-            if not text or len(text.strip()) < self.chunk_size:
-                # Si le texte est plus petit que la taille de chunk, le traiter comme un seul chunk
-                if text.strip():
-                    chunk = Chunk(
-                        id=generate_chunk_id(text, source_file, 0),
-                        content=text.strip(),
-                        source_file=source_file,
-                        chunk_index=0,
-                        embedding=None,  # Sera généré plus tard
-                        metadata={
-                            "file_size_mb": get_file_size_mb(source_file),
-                            "chunk_type": "single"
-                        }
-                    )
-                    return [chunk]
-                return []
-            
-            chunks = []
-            start = 0
-            chunk_index = 0
-            
-            while start < len(text):
-                # Définir la fin du chunk
-                end = start + self.chunk_size
-                
-                # Si ce n'est pas le dernier chunk, essayer de couper à un espace
-                if end < len(text):
-                    # Chercher le dernier espace dans la fenêtre de chevauchement
-                    overlap_start = max(start, end - self.chunk_overlap)
-                    last_space = text.rfind(' ', overlap_start, end)
-                    
-                    if last_space > start:
-                        end = last_space
-                
-                # Extraire le chunk
-                chunk_text = text[start:end].strip()
-                
-                if chunk_text:
-                    chunk = Chunk(
-                        id=generate_chunk_id(chunk_text, source_file, chunk_index),
-                        content=chunk_text,
-                        source_file=source_file,
-                        chunk_index=chunk_index,
-                        embedding=None,  # Sera généré plus tard
-                        metadata={
-                            "file_size_mb": get_file_size_mb(source_file),
-                            "chunk_type": "split",
-                            "start_char": start,
-                            "end_char": end,
-                            "text_length": len(chunk_text)
-                        }
-                    )
-                    chunks.append(chunk)
-                    chunk_index += 1
-                
-                # Passer au chunk suivant
-                start = end - self.chunk_overlap
-                
-                # Éviter les boucles infinies
-                if start >= len(text):
-                    break
-            
-            logger.debug(f"✓ {len(chunks)} chunks créés pour {source_file}")
-            return chunks
-            
-        except Exception as e:
-            logger.error(f"Erreur lors de la création des chunks pour {source_file}: {e}")
-            return []
+        return _split_into_chunks(text, source_file, self.chunk_size, self.chunk_overlap)
     
     def process_single_file(self, file_path: str) -> List[Chunk]:
         """
@@ -327,11 +328,19 @@ class FileProcessorService:
         try:
             files = settings.get_knowledge_base_files()
             
+            # Une seule passe : une extension en minuscules par fichier
+            supported_files = excel_files = word_files = 0
+            for file_path in files:
+                ext = os.path.splitext(file_path)[1].lower()
+                supported_files += ext in SUPPORTED_EXTENSIONS
+                excel_files += ext in EXCEL_EXTENSIONS
+                word_files += ext in WORD_EXTENSIONS
+            
             stats = {
                 "total_files": len(files),
-                "supported_files": len([f for f in files if is_supported_file(f, settings.SUPPORTED_EXTENSIONS)]),
-                "excel_files": len([f for f in files if f.lower().endswith(('.xlsx', '.xls'))]),
-                "word_files": len([f for f in files if f.lower().endswith(('.docx', '.doc'))]),
+                "supported_files": supported_files,
+                "excel_files": excel_files,
+                "word_files": word_files,
                 "chunk_size": self.chunk_size,
                 "chunk_overlap": self.chunk_overlap
             }
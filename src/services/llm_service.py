@@ -2,18 +2,103 @@
 Service LLM pour interagir avec le modèle Mistral via LMStudio
 """
 
+import hashlib
 import logging
+import random
+import threading
+from collections import OrderedDict
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
-from typing import List, Optional, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Dict, Any, Tuple
 import time
 
+try:
+    import orjson
+except ImportError:  # orjson est optionnel : repli sur le module json standard
+    orjson = None
+
+try:
+    import fastjsonschema
+except ImportError:  # fastjsonschema est optionnel : simple contrôle des clés requises
+    fastjsonschema = None
+
 from config.settings import settings
 from models.data_models import LLMResponse
 from utils.json_utils import extract_json_from_text, validate_json_structure
 
 logger = logging.getLogger(__name__)
 
+def _decode_json(response: requests.Response) -> Any:
+    """
+    Décode le corps JSON d'une réponse HTTP (orjson si disponible)
+    
+    Args:
+        response: Réponse HTTP
+        
+    Returns:
+        Objet JSON décodé
+    """
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return response.json()
+
+# Délai de base (secondes) du backoff exponentiel entre tentatives
+BACKOFF_BASE = 1.0
+
+# Clés obligatoires du JSON renvoyé par le LLM
+REQUIRED_KEYS = ["reponse", "confiance"]
+
+# Schéma JSON attendu dans les réponses du LLM
+RESPONSE_SCHEMA = {
+    "type": "object",
+    "required": REQUIRED_KEYS,
+    "properties": {
+        "reponse": {"type": "string"},
+        "confiance": {"type": ["number", "string"]},  # "0.85" accepté, converti par float()
+        "sources": {"type": "array", "items": {"type": "string"}}
+    }
+}
+
+# Validateur compilé une seule fois (fonction Python générée par fastjsonschema)
+_validate_response = fastjsonschema.compile(RESPONSE_SCHEMA) if fastjsonschema is not None else None
+
+def _is_valid_response(data: Any) -> bool:
+    """
+    Vérifie qu'un JSON extrait respecte le format de réponse attendu
+    
+    Args:
+        data: JSON extrait de la réponse du LLM
+        
+    Returns:
+        True si la réponse est exploitable, False sinon
+    """
+    if _validate_response is None:
+        return validate_json_structure(data, REQUIRED_KEYS)
+    try:
+        _validate_response(data)
+        return True
+    except fastjsonschema.JsonSchemaException:
+        return False
+
+# Message système identique pour toutes les requêtes
+SYSTEM_MESSAGE = {"role": "system", "content": settings.SYSTEM_PROMPT}
+
+# Gabarit du prompt utilisateur (question et contexte insérés à chaque appel)
+USER_PROMPT_TEMPLATE = """Question: {question}
+
+Contexte disponible:
+{context}
+
+Réponds UNIQUEMENT au format JSON suivant:
+{{
+    "reponse": "Contenu de la réponse",
+    "confiance": 0.85,
+    "sources": ["source1", "source2"]
+}}"""
+
 class LLMService:
     """
     Service pour interagir avec le LLM via l'API LMStudio
@@ -31,6 +116,28 @@ class LLMService:
         self.model = model or settings.LLM_MODEL
         self.max_tokens = settings.LLM_MAX_TOKENS
         self.temperature = settings.LLM_TEMPERATURE
+        self.cache_prompt = settings.LLM_CACHE_PROMPT
+        self.stream = settings.LLM_STREAM
+        self.models_endpoint = self.endpoint.replace("/v1/chat/completions", "/v1/models")
+        
+        # Cache LRU des réponses par (question, contexte), partagé entre threads
+        self._cache: "OrderedDict[bytes, LLMResponse]" = OrderedDict()
+        self._cache_size = settings.LLM_CACHE_SIZE
+        self._cache_lock = threading.Lock()
+        
+        # Disjoncteur : après trop d'échecs consécutifs de l'endpoint, plus d'appels pendant un délai
+        self._consecutive_failures = 0
+        self._circuit_open_until = 0.0
+        self._circuit_lock = threading.Lock()
+        
+        # Session HTTP partagée (keep-alive), pool dimensionné sur les requêtes simultanées
+        pool_size = max(16, settings.LLM_MAX_WORKERS)
+        self._session = requests.Session()
+        self._session.headers.update({"Content-Type": "application/json"})
+        # Pas de nouvelle tentative au niveau transport : les reprises sont gérées ici
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=Retry(total=0))
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
         
         logger.info(f"Initialisation du service LLM avec l'endpoint: {self.endpoint}")
         logger.info(f"Modèle utilisé: {self.model}")
@@ -46,8 +153,7 @@ class LLMService:
             True si la connexion réussit, False sinon
         """
         try:
-            response = requests.get(self.endpoint.replace("/v1/chat/completions", "/v1/models"), 
-                                 timeout=10)
+            response = self._session.get(self.models_endpoint, timeout=10)
             if response.status_code == 200:
                 logger.info("✓ Connexion à LMStudio réussie")
                 return True
@@ -58,7 +164,7 @@ class LLMService:
             logger.error(f"✗ Erreur de connexion à LMStudio: {e}")
             return False
     
-    def _create_chat_message(self, question: str, context_chunks: List[str]) -> List[Dict[str, str]]:
+    def _create_chat_message(self, question: str, context_chunks: List[str]) -> Tuple[Dict[str, str], ...]:
         """
         Crée le message de chat pour l'API
         
@@ -67,31 +173,18 @@ class LLMService:
             context_chunks: Chunks de contexte à utiliser
             
         Returns:
-            Liste de messages pour l'API
+            Messages pour l'API (message système partagé + message utilisateur)
         """
         # Construire le contexte
-        context_text = "\n\n".join([f"Contexte {i+1}: {chunk}" for i, chunk in enumerate(context_chunks)])
+        context_text = "\n\n".join(f"Contexte {i}: {chunk}" for i, chunk in enumerate(context_chunks, 1))
         
-        # Créer le prompt utilisateur
-        user_prompt = f"""Question: {question}
-
-Contexte disponible:
-{context_text}
-
-Réponds UNIQUEMENT au format JSON suivant:
-{{
-    "reponse": "Contenu de la réponse",
-    "confiance": 0.85,
-    "sources": ["source1", "source2"]
-}}"""
+        # Créer le prompt utilisateur à partir du gabarit constant
+        user_prompt = USER_PROMPT_TEMPLATE.format(question=question, context=context_text)
         
-        return [
-            {"role": "system", "content": settings.SYSTEM_PROMPT},
-            {"role": "user", "content": user_prompt}
-        ]
+        return (SYSTEM_MESSAGE, {"role": "user", "content": user_prompt})
     
     def generate_response(self, question: str, context_chunks: List[str], 
-                         max_retries: int = 3) -> Optional[LLMResponse]:
+                         max_retries: int = 3, use_cache: bool = True) -> Optional[LLMResponse]:
         """
         Génère une réponse à une question en utilisant le contexte fourni
         
@@ -99,55 +192,84 @@ Réponds UNIQUEMENT au format JSON suivant:
             question: Question à poser
             context_chunks: Chunks de contexte à utiliser
             max_retries: Nombre maximum de tentatives
+            use_cache: Réutiliser une réponse déjà générée pour la même question et le même contexte
             
         Returns:
             Réponse structurée du LLM ou None en cas d'échec
         """
+        cache_key = self._cache_key(question, context_chunks)
+        if use_cache:
+            with self._cache_lock:
+                cached = self._cache.get(cache_key)
+                if cached is not None:
+                    self._cache.move_to_end(cache_key)
+                    logger.debug("Réponse LLM servie depuis le cache")
+                    return cached
+        
+        # Créer le message de chat (une seule fois pour toutes les tentatives)
+        messages = self._create_chat_message(question, context_chunks)
+        
         for attempt in range(max_retries):
+            if self._circuit_is_open():
+                logger.warning("Endpoint LLM indisponible (disjoncteur ouvert), requête ignorée")
+                return None
+            
             try:
                 logger.debug(f"Tentative {attempt + 1}/{max_retries} pour la question: {question[:50]}...")
                 
-                # Créer le message de chat
-                messages = self._create_chat_message(question, context_chunks)
-                
                 # Préparer la requête
                 payload = {
                     "model": self.model,
                     "messages": messages,
                     "max_tokens": self.max_tokens,
                     "temperature": self.temperature,
-                    "stream": False
+                    "stream": self.stream
                 }
+                if self.cache_prompt:
+                    # Le prompt système est identique pour toutes les questions :
+                    # le serveur (LM Studio / llama.cpp) peut réutiliser son cache KV
+                    payload["cache_prompt"] = True
                 
                 # Envoyer la requête
-                response = requests.post(
-                    self.endpoint,
-                    json=payload,
-                    headers={"Content-Type": "application/json"},
-                    timeout=60
-                )
+                if orjson is not None:
+                    response = self._session.post(self.endpoint, data=orjson.dumps(payload),
+                                                  timeout=60, stream=self.stream)
+                else:
+                    response = self._session.post(self.endpoint, json=payload,
+                                                  timeout=60, stream=self.stream)
                 
                 if response.status_code != 200:
                     logger.error(f"Erreur API: {response.status_code} - {response.text}")
+                    # Seules les erreurs serveur (5xx) signalent un endpoint défaillant ; une
+                    # erreur client (contexte trop long par exemple) ne concerne que cette question
+                    if response.status_code >= 500:
+                        self._record_failure()
+                    else:
+                        self._record_success()
                     continue
+                self._record_success()
                 
-                # Parser la réponse
-                response_data = response.json()
-                content = response_data.get("choices", [{}])[0].get("message", {}).get("content", "")
+                # Parser la réponse (en flux : arrêt dès que le JSON attendu est complet)
+                json_data = None
+                if self.stream:
+                    content, json_data = self._read_stream(response)
+                else:
+                    response_data = _decode_json(response)
+                    content = response_data.get("choices", [{}])[0].get("message", {}).get("content", "")
                 
                 if not content:
                     logger.warning("Réponse vide du LLM")
                     continue
                 
                 # Extraire le JSON de la réponse
-                json_data = extract_json_from_text(content)
+                if json_data is None:
+                    json_data = extract_json_from_text(content)
                 if not json_data:
                     logger.warning("Aucun JSON trouvé dans la réponse du LLM")
                     continue
                 
                 # Valider la structure JSON
-                required_keys = ["reponse", "confiance"]
-                if not validate_json_structure(json_data, required_keys):
+                if not _is_valid_response(json_data):
                     logger.warning("Structure JSON invalide dans la réponse")
                     continue
                 
@@ -159,23 +281,133 @@ Réponds UNIQUEMENT au format JSON suivant:
                 )
                 
                 logger.info(f"✓ Réponse générée avec confiance: {llm_response.confiance}")
+                self._cache_put(cache_key, llm_response)
                 return llm_response
                 
             except requests.exceptions.Timeout:
                 logger.warning(f"Timeout lors de la tentative {attempt + 1}")
+                self._record_failure()
+                if attempt < max_retries - 1:
+                    time.sleep(self._backoff_delay(attempt))
+                continue
+                
+            except requests.exceptions.ConnectionError as e:
+                logger.error(f"Erreur de connexion au LLM (tentative {attempt + 1}): {e}")
+                self._record_failure()
                 if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)  # Backoff exponentiel
+                    time.sleep(self._backoff_delay(attempt))
                 continue
                 
             except Exception as e:
                 logger.error(f"Erreur lors de la génération de réponse (tentative {attempt + 1}): {e}")
                 if attempt < max_retries - 1:
-                    time.sleep(1)
+                    time.sleep(self._backoff_delay(0))
                 continue
         
         logger.error(f"Échec de génération de réponse après {max_retries} tentatives")
         return None
     
+    @staticmethod
+    def _backoff_delay(attempt: int) -> float:
+        """
+        Calcule l'attente avant une nouvelle tentative (backoff exponentiel avec jitter complet)
+        
+        Args:
+            attempt: Numéro de la tentative échouée (à partir de 0)
+            
+        Returns:
+            Délai en secondes, tiré uniformément dans [0, min(plafond, base * 2^attempt)]
+        """
+        return random.uniform(0, min(settings.LLM_BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+    
+    def _circuit_is_open(self) -> bool:
+        """Indique si le disjoncteur bloque actuellement les appels à l'endpoint"""
+        return time.monotonic() < self._circuit_open_until
+    
+    def _record_failure(self) -> None:
+        """Comptabilise un échec de l'endpoint et ouvre le disjoncteur au-delà du seuil"""
+        with self._circuit_lock:
+            self._consecutive_failures += 1
+            if self._consecutive_failures >= settings.LLM_CIRCUIT_THRESHOLD:
+                self._circuit_open_until = time.monotonic() + settings.LLM_CIRCUIT_COOLDOWN
+                self._consecutive_failures = 0
+                logger.error(f"✗ {settings.LLM_CIRCUIT_THRESHOLD} échecs consécutifs du LLM, "
+                             f"appels suspendus pendant {settings.LLM_CIRCUIT_COOLDOWN}s")
+    
+    def _record_success(self) -> None:
+        """Réinitialise le compteur d'échecs après une réponse de l'endpoint (hors erreur serveur)"""
+        if self._consecutive_failures:
+            with self._circuit_lock:
+                self._consecutive_failures = 0
+    
+    def _read_stream(self, response: requests.Response) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        Lit une réponse SSE et s'arrête dès qu'un objet JSON valide est complet
+        
+        Args:
+            response: Réponse HTTP ouverte en mode stream
+            
+        Returns:
+            Tuple (contenu reçu, JSON extrait ou None si non trouvé pendant le flux)
+        """
+        parts = []
+        try:
+            for line in response.iter_lines():
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    break
+                
+                event = orjson.loads(data) if orjson is not None else json.loads(data)
+                choices = event.get("choices") or [{}]
+                delta = choices[0].get("delta", {}).get("content")
+                if not delta:
+                    continue
+                parts.append(delta)
+                
+                # Une accolade fermante peut compléter l'objet JSON attendu
+                if "}" in delta:
+                    content = "".join(parts)
+                    json_data = extract_json_from_text(content)
+                    if json_data and _is_valid_response(json_data):
+                        return content, json_data
+        finally:
+            # Fermer la réponse interrompt la génération restante
+            response.close()
+        
+        return "".join(parts), None
+    
+    def _cache_key(self, question: str, context_chunks: List[str]) -> bytes:
+        """
+        Calcule la clé de cache d'une question et de son contexte
+        
+        Args:
+            question: Question posée
+            context_chunks: Chunks de contexte
+            
+        Returns:
+            Empreinte BLAKE2b (16 octets)
+        """
+        return hashlib.blake2b(
+            b"\x00".join([self.model.encode(), question.encode(), *(chunk.encode() for chunk in context_chunks)]),
+            digest_size=16
+        ).digest()
+    
+    def _cache_put(self, key: bytes, response: LLMResponse) -> None:
+        """
+        Mémorise une réponse en évinçant la moins récemment utilisée
+        
+        Args:
+            key: Clé de cache
+            response: Réponse à mémoriser
+        """
+        with self._cache_lock:
+            self._cache[key] = response
+            self._cache.move_to_end(key)
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+    
     def generate_responses_batch(self, questions_with_context: List[tuple], 
                                max_retries: int = 3) -> List[Optional[LLMResponse]]:
         """
@@ -188,19 +420,16 @@ Réponds UNIQUEMENT au format JSON suivant:
         Returns:
             Liste de réponses (None pour les échecs)
         """
-        results = []
+        total = len(questions_with_context)
         
-        for i, (question, context_chunks) in enumerate(questions_with_context):
-            logger.info(f"Traitement de la question {i+1}/{len(questions_with_context)}")
-            
-            response = self.generate_response(question, context_chunks, max_retries)
-            results.append(response)
-            
-            # Pause entre les requêtes pour éviter la surcharge
-            if i < len(questions_with_context) - 1:
-                time.sleep(0.5)
+        def generate(indexed_item: tuple) -> Optional[LLMResponse]:
+            i, (question, context_chunks) = indexed_item
+            logger.info(f"Traitement de la question {i+1}/{total}")
+            return self.generate_response(question, context_chunks, max_retries)
         
-        return results
+        # Requêtes simultanées sur la session partagée ; l'ordre des réponses est conservé
+        with ThreadPoolExecutor(max_workers=max(1, min(settings.LLM_MAX_WORKERS, total))) as executor:
+            return list(executor.map(generate, enumerate(questions_with_context)))
     
     def test_connection(self) -> bool:
         """
@@ -213,7 +442,7 @@ Réponds UNIQUEMENT au format JSON suivant:
             test_question = "Test de connexion"
             test_context = ["Ceci est un test de connexion au service LLM."]
             
-            response = self.generate_response(test_question, test_context, max_retries=1)
+            response = self.generate_response(test_question, test_context, max_retries=1, use_cache=False)
             
             if response and response.reponse:
                 logger.info("✓ Test de connexion LLM réussi")
@@ -234,13 +463,10 @@ Réponds UNIQUEMENT au format JSON suivant:
             Dictionnaire avec les informations du modèle
         """
         try:
-            response = requests.get(
-                self.endpoint.replace("/v1/chat/completions", "/v1/models"),
-                timeout=10
-            )
+            response = self._session.get(self.models_endpoint, timeout=10)
             
             if response.status_code == 200:
-                models = response.json().get("data", [])
+                models = _decode_json(response).get("data", [])
                 for model in models:
                     if model.get("id") == self.model:
                         return {
@@ -2,18 +2,158 @@
 Service de gestion de la base vectorielle Milvus
 """
 
+import ast
+import hashlib
+import json
 import logging
-from typing import List, Optional, Dict, Any
+import math
+import struct
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Dict, Any, Tuple
 import time
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # orjson est optionnel : repli sur le module json standard
+    orjson = None
 
 from pymilvus import connections, Collection, CollectionSchema, FieldSchema, DataType, utility
 from pymilvus.exceptions import MilvusException
 
 from config.settings import settings
+from milvus import get_connection, reset_connection, MILVUS_ALIAS
 from models.data_models import Chunk, VectorSearchResult
 
 logger = logging.getLogger(__name__)
 
+# Étiquette de version du schéma inscrite dans la description de la collection :
+# les collections qui la portent stockent des embeddings normalisés indexés en produit scalaire
+SCHEMA_VERSION_TAG = "[schema:v2-ip]"
+COLLECTION_DESCRIPTION = f"Base de connaissances AOR {SCHEMA_VERSION_TAG}"
+
+# Types de vecteurs Milvus par format de stockage (FLOAT16_VECTOR n'existe qu'à partir de pymilvus 2.4)
+VECTOR_DTYPES = {
+    "float32": (DataType.FLOAT_VECTOR, np.float32),
+    "float16": (getattr(DataType, "FLOAT16_VECTOR", None), np.float16),
+}
+
+# En dessous de ce volume, une recherche exhaustive (FLAT) est plus rapide qu'un index IVF
+FLAT_INDEX_MAX_ENTITIES = 100_000
+
+# Tampons d'embeddings réutilisés entre insertions, par (capacité puissance de 2, dimension) :
+# seul le dernier tampon rendu est gardé, et seulement s'il ne dépasse pas ce plafond
+EMBEDDING_BUFFER_POOL_MAX_BYTES = 64 * 1024 * 1024
+_EMBEDDING_BUFFERS: Dict[Tuple[int, int], np.ndarray] = {}
+_EMBEDDING_BUFFERS_LOCK = threading.Lock()
+
+def _acquire_embedding_buffer(rows: int, dimension: int) -> np.ndarray:
+    """
+    Fournit un tampon float32 d'au moins `rows` lignes (réutilisé si disponible)
+    
+    Args:
+        rows: Nombre de lignes nécessaires
+        dimension: Dimension des embeddings
+        
+    Returns:
+        Tampon (capacité, dimension), la capacité étant arrondie à la puissance de 2 supérieure
+    """
+    capacity = 1 << max(0, rows - 1).bit_length()
+    with _EMBEDDING_BUFFERS_LOCK:
+        buffer = _EMBEDDING_BUFFERS.pop((capacity, dimension), None)
+    if buffer is None:
+        buffer = np.empty((capacity, dimension), dtype=np.float32)
+    return buffer
+
+def _release_embedding_buffer(buffer: np.ndarray) -> None:
+    """
+    Rend un tampon au pool pour les insertions suivantes
+    
+    Le pool ne garde que ce tampon (le plus récent) ; un tampon plus grand
+    que EMBEDDING_BUFFER_POOL_MAX_BYTES est libéré, pour ne pas retenir la
+    mémoire d'une grosse ingestion une fois l'indexation terminée.
+    
+    Args:
+        buffer: Tampon obtenu par _acquire_embedding_buffer
+    """
+    with _EMBEDDING_BUFFERS_LOCK:
+        _EMBEDDING_BUFFERS.clear()
+        if buffer.nbytes <= EMBEDDING_BUFFER_POOL_MAX_BYTES:
+            _EMBEDDING_BUFFERS[buffer.shape] = buffer
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """
+    Normalise (L2) les lignes d'une matrice d'embeddings, en place
+    
+    Args:
+        matrix: Matrice float32 (n, dimension)
+        
+    Returns:
+        La même matrice, lignes de norme 1
+    """
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True).clip(1e-12)
+    return matrix
+
+def _index_params_for(num_entities: int, metric_type: str, ivf_index_type: str = "IVF_FLAT") -> Dict[str, Any]:
+    """
+    Choisit les paramètres d'index adaptés au volume de la collection
+    
+    Args:
+        num_entities: Nombre de vecteurs dans la collection
+        metric_type: Métrique de similarité
+        ivf_index_type: Index IVF à utiliser au-delà du seuil (IVF_FLAT ou IVF_SQ8)
+        
+    Returns:
+        Paramètres d'index Milvus (FLAT, ou index IVF avec nlist ≈ 4·√n)
+    """
+    if num_entities < FLAT_INDEX_MAX_ENTITIES:
+        return {"metric_type": metric_type, "index_type": "FLAT", "params": {}}
+    nlist = max(64, min(65536, int(4 * math.sqrt(num_entities))))
+    return {"metric_type": metric_type, "index_type": ivf_index_type, "params": {"nlist": nlist}}
+
+def _dump_metadata(metadata: Dict[str, Any]) -> str:
+    """
+    Sérialise les métadonnées d'un chunk en JSON (orjson si disponible)
+    
+    Args:
+        metadata: Métadonnées du chunk
+        
+    Returns:
+        Chaîne JSON
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(metadata, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode()
+        except TypeError:
+            pass  # Type non géré par orjson : repli sur json
+    return json.dumps(metadata, ensure_ascii=False, default=str)
+
+def _parse_metadata(raw: Optional[str]) -> Dict[str, Any]:
+    """
+    Décode les métadonnées d'un chunk stockées dans Milvus
+    
+    Args:
+        raw: Métadonnées sérialisées (JSON, ou repr Python pour les anciennes lignes)
+        
+    Returns:
+        Dictionnaire de métadonnées (vide si illisible)
+    """
+    if not raw:
+        return {}
+    try:
+        # orjson.JSONDecodeError hérite de json.JSONDecodeError
+        return orjson.loads(raw) if orjson is not None else json.loads(raw)
+    except json.JSONDecodeError:
+        pass
+    try:
+        # Lignes insérées avant le passage au JSON (str(dict)) : évaluation littérale sans exécution
+        metadata = ast.literal_eval(raw)
+        return metadata if isinstance(metadata, dict) else {}
+    except (ValueError, SyntaxError):
+        logger.warning("Métadonnées de chunk illisibles, ignorées")
+        return {}
+
 class VectorStoreService:
     """
     Service pour la gestion de la base vectorielle Milvus
@@ -31,6 +171,20 @@ class VectorStoreService:
         self.port = port or settings.MILVUS_PORT
         self.collection_name = settings.MILVUS_COLLECTION_NAME
         self.dimension = settings.MILVUS_DIMENSION
+        self.metric_type = "IP"
+        self.vector_field_type, self.vector_dtype = self._resolve_vector_dtype(settings.MILVUS_EMBED_DTYPE)
+        self.index_type = "FLAT"
+        self.nlist = 0
+        
+        # Handle de collection mis en cache (chargée en mémoire une seule fois)
+        self._collection: Optional[Collection] = None
+        self._collection_loaded = False
+        self._collection_lock = threading.Lock()
+        
+        # Cache LRU des résultats de recherche, vidé à chaque modification de la collection
+        self._query_cache: "OrderedDict[bytes, List[VectorSearchResult]]" = OrderedDict()
+        self._query_cache_size = settings.VECTOR_QUERY_CACHE_SIZE
+        self._query_cache_lock = threading.Lock()
         
         logger.info(f"Initialisation du service Milvus: {self.host}:{self.port}")
         
@@ -48,11 +202,7 @@ class VectorStoreService:
             True si la connexion réussit, False sinon
         """
         try:
-            connections.connect(
-                alias="default",
-                host=self.host,
-                port=self.port
-            )
+            get_connection(self.host, self.port)
             logger.info("✓ Connexion à Milvus réussie")
             return True
         except Exception as e:
@@ -70,6 +220,14 @@ class VectorStoreService:
             # Vérifier si la collection existe
             if utility.has_collection(self.collection_name):
                 logger.info(f"Collection '{self.collection_name}' existe déjà")
+                collection = Collection(self.collection_name)
+                # Les collections créées avant la normalisation restent en COSINE
+                if SCHEMA_VERSION_TAG not in (collection.description or ""):
+                    self.metric_type = "COSINE"
+                    logger.info("Ancienne collection détectée, recherche en COSINE")
+                self._read_index_params(collection)
+                self._read_vector_dtype(collection)
+                self._set_collection(collection)
                 return True
             
             # Définir le schéma de la collection
@@ -78,23 +236,24 @@ class VectorStoreService:
                 FieldSchema(name="content", dtype=DataType.VARCHAR, max_length=65535),
                 FieldSchema(name="source_file", dtype=DataType.VARCHAR, max_length=65535),
                 FieldSchema(name="chunk_index", dtype=DataType.INT64),
-                FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=self.dimension),
+                FieldSchema(name="embedding", dtype=self.vector_field_type, dim=self.dimension),
                 FieldSchema(name="metadata", dtype=DataType.VARCHAR, max_length=65535)
             ]
             
-            schema = CollectionSchema(fields=fields, description="Base de connaissances AOR")
+            schema = CollectionSchema(fields=fields, description=COLLECTION_DESCRIPTION)
             
             # Créer la collection
             collection = Collection(name=self.collection_name, schema=schema)
             
-            # Créer l'index
-            index_params = {
-                "metric_type": "COSINE",
-                "index_type": "IVF_FLAT",
-                "params": {"nlist": 1024}
-            }
+            # Créer l'index (embeddings normalisés : produit scalaire = cosinus).
+            # La collection est vide : index FLAT, reconstruit par rebuild_index() après chargement
+            self.metric_type = "IP"
+            index_params = _index_params_for(0, self.metric_type)
             
             collection.create_index(field_name="embedding", index_params=index_params)
+            self.index_type = index_params["index_type"]
+            self.nlist = 0
+            self._set_collection(collection)
             logger.info(f"✓ Collection '{self.collection_name}' créée avec succès")
             
             return True
@@ -103,63 +262,215 @@ class VectorStoreService:
             logger.error(f"✗ Erreur lors de l'initialisation de la collection: {e}")
             return False
     
-    def insert_chunks(self, chunks: List[Chunk]) -> bool:
+    def _resolve_vector_dtype(self, name: str) -> Tuple[DataType, type]:
+        """
+        Détermine le type de vecteur Milvus et le dtype NumPy à utiliser
+        
+        Args:
+            name: Format demandé ("float32" ou "float16")
+            
+        Returns:
+            Tuple (type de champ Milvus, dtype NumPy)
+        """
+        field_type, dtype = VECTOR_DTYPES.get(name, (None, None))
+        if field_type is None:
+            logger.warning(f"Format de vecteur '{name}' non disponible, utilisation de float32")
+            return VECTOR_DTYPES["float32"]
+        return field_type, dtype
+    
+    def _read_vector_dtype(self, collection: Collection) -> None:
+        """
+        Aligne le format des vecteurs sur celui d'une collection existante
+        
+        Args:
+            collection: Collection Milvus
+        """
+        for field in collection.schema.fields:
+            if field.name != "embedding":
+                continue
+            for field_type, dtype in VECTOR_DTYPES.values():
+                if field_type is not None and field.dtype == field_type:
+                    self.vector_field_type, self.vector_dtype = field_type, dtype
+    
+    def _read_index_params(self, collection: Collection) -> None:
+        """
+        Relit le type d'index et le nlist d'une collection existante
+        
+        Args:
+            collection: Collection Milvus
+        """
+        for index in collection.indexes:
+            params = index.params or {}
+            self.index_type = params.get("index_type", self.index_type)
+            index_specific = params.get("params") or {}
+            if isinstance(index_specific, str):
+                index_specific = json.loads(index_specific)
+            self.nlist = int(index_specific.get("nlist", 0))
+    
+    def rebuild_index(self) -> bool:
+        """
+        Reconstruit l'index si le volume de la collection justifie d'autres paramètres
+        
+        À appeler après un chargement massif : FLAT sous FLAT_INDEX_MAX_ENTITIES
+        vecteurs, MILVUS_IVF_INDEX_TYPE (IVF_FLAT ou IVF_SQ8) avec nlist ≈ 4·√n au-delà.
+        
+        Returns:
+            True si l'index est à jour, False en cas d'erreur
+        """
+        try:
+            collection = self._get_collection()
+            index_params = _index_params_for(
+                collection.num_entities, self.metric_type, settings.MILVUS_IVF_INDEX_TYPE
+            )
+            nlist = index_params["params"].get("nlist", 0)
+            if index_params["index_type"] == self.index_type and nlist == self.nlist:
+                return True
+            
+            with self._collection_lock:
+                collection.release()
+                self._collection_loaded = False
+                collection.drop_index()
+                collection.create_index(field_name="embedding", index_params=index_params)
+                utility.wait_for_index_building_complete(self.collection_name)
+            
+            self.index_type = index_params["index_type"]
+            self.nlist = nlist
+            logger.info(f"✓ Index reconstruit: {self.index_type} (nlist={nlist})")
+            return True
+            
+        except Exception as e:
+            logger.error(f"✗ Erreur lors de la reconstruction de l'index: {e}")
+            return False
+    
+    def _search_params(self, nprobe: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Construit les paramètres de recherche pour l'index courant
+        
+        Args:
+            nprobe: Nombre de partitions IVF à explorer (≈ √nlist par défaut)
+            
+        Returns:
+            Paramètres de recherche Milvus
+        """
+        params = {}
+        if self.index_type.startswith("IVF"):
+            params["nprobe"] = nprobe or max(1, int(math.sqrt(self.nlist)))
+        return {"metric_type": self.metric_type, "params": params}
+    
+    def _set_collection(self, collection: Optional[Collection]) -> None:
+        """
+        Remplace le handle de collection mis en cache
+        
+        Args:
+            collection: Nouveau handle (None pour forcer sa recréation)
+        """
+        with self._collection_lock:
+            self._collection = collection
+            self._collection_loaded = False
+    
+    def _get_collection(self, load: bool = False) -> Collection:
+        """
+        Retourne le handle de collection mis en cache
+        
+        Args:
+            load: Charger la collection en mémoire (une seule fois) avant une recherche
+            
+        Returns:
+            Collection Milvus
+        """
+        with self._collection_lock:
+            if self._collection is None:
+                self._collection = Collection(self.collection_name)
+                self._collection_loaded = False
+            if load and not self._collection_loaded:
+                self._collection.load()
+                self._collection_loaded = True
+            return self._collection
+    
+    def insert_chunks(self, chunks: List[Chunk], batch_size: Optional[int] = None,
+                      auto_flush: bool = False) -> int:
         """
         Insère des chunks dans la base vectorielle
         
+        Les données sont envoyées par lots (un appel gRPC par lot, pour rester
+        sous la taille maximale des messages). Les identifiants étant
+        déterministes, un chunk déjà présent est remplacé (upsert) au lieu
+        d'être dupliqué. Sans auto_flush, l'appelant persiste les données par
+        un seul appel à flush() en fin de traitement.
+        
         Args:
             chunks: Liste de chunks à insérer
+            batch_size: Nombre de lignes par appel d'insertion (VECTOR_INSERT_BATCH par défaut)
+            auto_flush: Persister immédiatement les données (flush)
             
         Returns:
-            True si l'insertion réussit, False sinon
+            Nombre de chunks insérés
         """
+        inserted = 0
         try:
             if not chunks:
                 logger.warning("Aucun chunk à insérer")
-                return True
+                return 0
             
-            collection = Collection(self.collection_name)
+            collection = self._get_collection()
             
-            # Préparer les données
-            ids = []
-            contents = []
-            source_files = []
-            chunk_indices = []
-            embeddings = []
-            metadatas = []
+            valid_chunks = [chunk for chunk in chunks if chunk.embedding is not None]
+            if len(valid_chunks) < len(chunks):
+                logger.warning(f"{len(chunks) - len(valid_chunks)} chunks sans embedding ignorés")
             
-            for chunk in chunks:
-                if not chunk.embedding:
-                    logger.warning(f"Chunk {chunk.id} sans embedding, ignoré")
-                    continue
-                
-                ids.append(chunk.id)
-                contents.append(chunk.content)
-                source_files.append(chunk.source_file)
-                chunk_indices.append(chunk.chunk_index)
-                embeddings.append(chunk.embedding)
-                metadatas.append(str(chunk.metadata))
-            
-            if not ids:
+            if not valid_chunks:
                 logger.warning("Aucun chunk valide à insérer")
-                return True
-            
-            # Insérer les données
-            data = [ids, contents, source_files, chunk_indices, embeddings, metadatas]
-            collection.insert(data)
-            
-            # Flush pour s'assurer que les données sont persistées
-            collection.flush()
-            
-            logger.info(f"✓ {len(ids)} chunks insérés dans Milvus")
-            return True
+                return 0
+            
+            # Préparer les données dans des colonnes pré-dimensionnées
+            n = len(valid_chunks)
+            ids = [None] * n
+            contents = [None] * n
+            source_files = [None] * n
+            chunk_indices = [0] * n
+            metadatas = [None] * n
+            buffer = _acquire_embedding_buffer(n, self.dimension)
+            embeddings = buffer[:n]
+            
+            try:
+                for i, chunk in enumerate(valid_chunks):
+                    ids[i] = chunk.id
+                    contents[i] = chunk.content
+                    source_files[i] = chunk.source_file
+                    chunk_indices[i] = chunk.chunk_index
+                    embeddings[i] = chunk.embedding
+                    metadatas[i] = _dump_metadata(chunk.metadata)
+                _normalize_rows(embeddings)
+                
+                # Insérer (ou remplacer) les données par lots
+                batch_size = max(1, batch_size or settings.VECTOR_INSERT_BATCH)
+                for start in range(0, n, batch_size):
+                    end = min(start + batch_size, n)
+                    collection.upsert([
+                        ids[start:end], contents[start:end], source_files[start:end],
+                        chunk_indices[start:end], list(embeddings[start:end].astype(self.vector_dtype, copy=False)),
+                        metadatas[start:end]
+                    ])
+                    inserted += end - start
+            finally:
+                _release_embedding_buffer(buffer)
+            
+            if auto_flush:
+                collection.flush()
+            self._invalidate_query_cache()
+            
+            logger.info(f"✓ {inserted} chunks insérés dans Milvus")
+            return inserted
             
         except Exception as e:
-            logger.error(f"✗ Erreur lors de l'insertion des chunks: {e}")
-            return False
+            if inserted:
+                self._invalidate_query_cache()
+            logger.error(f"✗ Erreur lors de l'insertion des chunks ({inserted} déjà insérés): {e}")
+            return inserted
     
     def search_similar_chunks(self, query_embedding: List[float], 
-                            limit: int = 5, threshold: float = 0.8) -> List[VectorSearchResult]:
+                            limit: int = 5, threshold: float = 0.8,
+                            nprobe: Optional[int] = None) -> List[VectorSearchResult]:
         """
         Recherche les chunks les plus similaires à un embedding de requête
         
@@ -167,59 +478,156 @@ class VectorStoreService:
             query_embedding: Embedding de la requête
             limit: Nombre maximum de résultats
             threshold: Seuil de similarité minimum
+            nprobe: Partitions IVF à explorer (dérivé de nlist par défaut)
             
         Returns:
             Liste des résultats de recherche
         """
+        return self.search_similar_chunks_batch([query_embedding], limit, threshold, nprobe)[0]
+    
+    def search_similar_chunks_batch(self, query_embeddings,
+                                    limit: int = 5, threshold: float = 0.8,
+                                    nprobe: Optional[int] = None) -> List[List[VectorSearchResult]]:
+        """
+        Recherche les chunks similaires pour plusieurs requêtes en un seul appel Milvus
+        
+        Les requêtes déjà présentes dans le cache ne sont pas renvoyées à Milvus.
+        
+        Args:
+            query_embeddings: Embeddings des requêtes (liste ou matrice (N, dim))
+            limit: Nombre maximum de résultats par requête
+            threshold: Seuil de similarité minimum
+            nprobe: Partitions IVF à explorer (dérivé de nlist par défaut)
+            
+        Returns:
+            Liste des résultats de recherche pour chaque requête, dans l'ordre d'entrée
+        """
         try:
-            collection = Collection(self.collection_name)
-            collection.load()
+            if len(query_embeddings) == 0:
+                return []
             
-            # Paramètres de recherche
-            search_params = {
-                "metric_type": "COSINE",
-                "params": {"nprobe": 10}
-            }
+            queries = np.array(query_embeddings, dtype=np.float32, ndmin=2)
+            cache_keys = [self._query_cache_key(query, limit, threshold, nprobe) for query in queries]
+            batch_results = [self._query_cache_get(key) for key in cache_keys]
+            missing = [i for i, results in enumerate(batch_results) if results is None]
             
-            # Effectuer la recherche
-            results = collection.search(
-                data=[query_embedding],
-                anns_field="embedding",
-                param=search_params,
-                limit=limit,
-                output_fields=["id", "content", "source_file", "chunk_index", "metadata"]
-            )
+            if missing:
+                collection = self._get_collection(load=True)
+                
+                # Paramètres de recherche
+                search_params = self._search_params(nprobe)
+                
+                # Effectuer une seule recherche pour toutes les requêtes absentes du cache
+                results = collection.search(
+                    data=_normalize_rows(queries[missing]).astype(self.vector_dtype, copy=False),
+                    anns_field="embedding",
+                    param=search_params,
+                    limit=limit,
+                    output_fields=["id", "content", "source_file", "chunk_index", "metadata"]
+                )
+                
+                for i, hits in zip(missing, results):
+                    batch_results[i] = self._hits_to_results(hits, queries[i], threshold)
+                    self._query_cache_put(cache_keys[i], batch_results[i])
             
-            # Traiter les résultats
-            search_results = []
-            for hits in results:
-                for hit in hits:
-                    if hit.score >= threshold:
-                        # Créer l'objet Chunk
-                        chunk = Chunk(
-                            id=hit.entity.get("id"),
-                            content=hit.entity.get("content"),
-                            source_file=hit.entity.get("source_file"),
-                            chunk_index=hit.entity.get("chunk_index"),
-                            embedding=query_embedding,  # On ne stocke pas l'embedding original
-                            metadata=eval(hit.entity.get("metadata", "{}"))
-                        )
-                        
-                        # Créer le résultat de recherche
-                        search_result = VectorSearchResult(
-                            chunk=chunk,
-                            similarity_score=hit.score,
-                            rank=len(search_results) + 1
-                        )
-                        
-                        search_results.append(search_result)
-            
-            logger.info(f"✓ {len(search_results)} chunks similaires trouvés (seuil: {threshold})")
-            return search_results
+            logger.info(
+                f"✓ Recherche groupée pour {len(batch_results)} requêtes "
+                f"({len(batch_results) - len(missing)} depuis le cache, seuil: {threshold})"
+            )
+            return batch_results
             
         except Exception as e:
-            logger.error(f"✗ Erreur lors de la recherche de chunks similaires: {e}")
-            return []
+            logger.error(f"✗ Erreur lors de la recherche groupée de chunks similaires: {e}")
+            return [[] for _ in range(len(query_embeddings))]
+    
+    def _query_cache_key(self, query_embedding, limit: int, threshold: float,
+                         nprobe: Optional[int] = None) -> bytes:
+        """
+        Calcule la clé de cache d'une recherche
+        
+        Args:
+            query_embedding: Embedding de la requête
+            limit: Nombre maximum de résultats
+            threshold: Seuil de similarité minimum
+            nprobe: Partitions IVF explorées (0 = valeur par défaut)
+            
+        Returns:
+            Empreinte BLAKE2b (16 octets)
+        """
+        return hashlib.blake2b(
+            np.ascontiguousarray(query_embedding, dtype=np.float32).tobytes()
+            + struct.pack("<idi", limit, threshold, nprobe or 0),
+            digest_size=16
+        ).digest()
+    
+    def _query_cache_get(self, key: bytes) -> Optional[List[VectorSearchResult]]:
+        """
+        Cherche des résultats de recherche dans le cache
+        
+        Args:
+            key: Clé de cache
+            
+        Returns:
+            Résultats en cache ou None
+        """
+        with self._query_cache_lock:
+            results = self._query_cache.get(key)
+            if results is not None:
+                self._query_cache.move_to_end(key)
+            return results
+    
+    def _query_cache_put(self, key: bytes, results: List[VectorSearchResult]) -> None:
+        """
+        Mémorise des résultats de recherche en évinçant les moins récemment utilisés
+        
+        Args:
+            key: Clé de cache
+            results: Résultats à mémoriser
+        """
+        with self._query_cache_lock:
+            self._query_cache[key] = results
+            self._query_cache.move_to_end(key)
+            if len(self._query_cache) > self._query_cache_size:
+                self._query_cache.popitem(last=False)
+    
+    def _invalidate_query_cache(self) -> None:
+        """Vide le cache de recherche après une modification de la collection"""
+        with self._query_cache_lock:
+            self._query_cache.clear()
+    
+    def _hits_to_results(self, hits, query_embedding, threshold: float) -> List[VectorSearchResult]:
+        """
+        Convertit les hits Milvus d'une requête en résultats de recherche
+        
+        Args:
+            hits: Hits retournés par Milvus pour une requête
+            query_embedding: Embedding de la requête
+            threshold: Seuil de similarité minimum
+            
+        Returns:
+            Liste des résultats au-dessus du seuil
+        """
+        search_results = []
+        for hit in hits:
+            if hit.score >= threshold:
+                # Créer l'objet Chunk
+                chunk = Chunk(
+                    id=hit.entity.get("id"),
+                    content=hit.entity.get("content"),
+                    source_file=hit.entity.get("source_file"),
+                    chunk_index=hit.entity.get("chunk_index"),
+                    embedding=np.asarray(query_embedding, dtype=np.float32),  # On ne stocke pas l'embedding original
+                    metadata=_parse_metadata(hit.entity.get("metadata"))
+                )
+                
+                # Créer le résultat de recherche
+                search_results.append(VectorSearchResult(
+                    chunk=chunk,
+                    similarity_score=hit.score,
+                    rank=len(search_results) + 1
+                ))
+        
+        return search_results
     
     def get_collection_stats(self) -> Dict[str, Any]:
         """
@@ -229,7 +637,7 @@ class VectorStoreService:
             Dictionnaire avec les statistiques
         """
         try:
-            collection = Collection(self.collection_name)
+            collection = self._get_collection()
             
             stats = {
                 "collection_name": self.collection_name,
@@ -248,13 +656,18 @@ class VectorStoreService:
         """
         Vide la collection (supprime tous les vecteurs)
         
+        La collection est supprimée puis recréée avec le même schéma, ce qui
+        évite de marquer chaque ligne comme supprimée.
+        
         Returns:
             True si la suppression réussit, False sinon
         """
         try:
-            collection = Collection(self.collection_name)
-            collection.delete("id like '%'")  # Supprimer tous les vecteurs
-            collection.flush()
+            utility.drop_collection(self.collection_name)
+            self._set_collection(None)
+            self._invalidate_query_cache()
+            if not self._init_collection():
+                return False
             
             logger.info(f"✓ Collection '{self.collection_name}' vidée")
             return True
@@ -263,20 +676,23 @@ class VectorStoreService:
             logger.error(f"✗ Erreur lors du vidage de la collection: {e}")
             return False
     
-    def delete_chunks_by_source(self, source_file: str) -> bool:
+    def delete_chunks_by_source(self, source_file: str, auto_flush: bool = False) -> bool:
         """
         Supprime tous les chunks d'un fichier source
         
         Args:
             source_file: Chemin du fichier source
+            auto_flush: Persister immédiatement la suppression (flush)
             
         Returns:
             True si la suppression réussit, False sinon
         """
         try:
-            collection = Collection(self.collection_name)
+            collection = self._get_collection()
             collection.delete(f'source_file == "{source_file}"')
-            collection.flush()
+            if auto_flush:
+                collection.flush()
+            self._invalidate_query_cache()
             
             logger.info(f"✓ Chunks supprimés pour le fichier: {source_file}")
             return True
@@ -285,6 +701,24 @@ class VectorStoreService:
             logger.error(f"✗ Erreur lors de la suppression des chunks: {e}")
             return False
     
+    def flush(self) -> bool:
+        """
+        Persiste les insertions et suppressions en attente (scellement des segments)
+        
+        À appeler une fois à la fin d'un traitement plutôt qu'après chaque écriture.
+        
+        Returns:
+            True si le flush réussit, False sinon
+        """
+        try:
+            self._get_collection().flush()
+            logger.info(f"✓ Collection '{self.collection_name}' persistée")
+            return True
+            
+        except Exception as e:
+            logger.error(f"✗ Erreur lors du flush de la collection: {e}")
+            return False
+    
     def test_connection(self) -> bool:
         """
         Teste la connexion à Milvus
@@ -294,7 +728,8 @@ class VectorStoreService:
         """
         try:
             # Vérifier la connexion
-            if not connections.has_connection("default"):
+            if not connections.has_connection(MILVUS_ALIAS):
+                reset_connection()
                 return self._connect()
             
             # Vérifier que la collection existe
@@ -306,13 +741,4 @@ class VectorStoreService:
             
         except Exception as e:
             logger.error(f"✗ Erreur lors du test de connexion Milvus: {e}")
-            return False
-    
-    def __del__(self):
-        """
-        Destructeur pour fermer la connexion
-        """
-        try:
-            connections.disconnect("default")
-        except:
-            pass 
\ No newline at end of file
+            return False 
\ No newline at end of file
@@ -6,7 +6,7 @@ import unittest
 import numpy as np
 from unittest.mock import Mock, patch
 
-from services.embedding_service import EmbeddingService
+from services.embedding_service import EmbeddingService, EmbeddingIndex
 
 class TestEmbeddingService(unittest.TestCase):
     """Tests pour le service d'embedding"""
@@ -16,6 +16,7 @@ class TestEmbeddingService(unittest.TestCase):
         # Mock du modèle sentence-transformers
         self.mock_model = Mock()
         self.mock_model.encode.return_value = np.array([0.1, 0.2, 0.3, 0.4])
+        self.mock_model.get_sentence_embedding_dimension.return_value = 4
         
         with patch('services.embedding_service.SentenceTransformer') as mock_transformer:
             mock_transformer.return_value = self.mock_model
@@ -28,9 +29,9 @@ class TestEmbeddingService(unittest.TestCase):
         embedding = self.embedding_service.generate_embedding(text)
         
         self.assertIsNotNone(embedding)
-        self.assertIsInstance(embedding, list)
-        self.assertEqual(len(embedding), 4)
-        self.assertTrue(all(isinstance(x, float) for x in embedding))
+        self.assertIsInstance(embedding, np.ndarray)
+        self.assertEqual(embedding.shape, (4,))
+        self.assertEqual(embedding.dtype, np.float32)
     
     def test_generate_embedding_empty_text(self):
         """Test avec texte vide"""
@@ -62,7 +63,34 @@ class TestEmbeddingService(unittest.TestCase):
         embeddings = self.embedding_service.generate_embeddings_batch(texts)
         
         self.assertEqual(len(embeddings), 3)
-        self.assertTrue(all(isinstance(emb, list) for emb in embeddings if emb is not None))
+        self.assertTrue(all(isinstance(emb, np.ndarray) for emb in embeddings if emb is not None))
+    
+    def test_generate_embeddings_batch_uses_cache(self):
+        """Test de réutilisation des embeddings déjà calculés"""
+        self.mock_model.encode.return_value = np.array([[0.1, 0.2, 0.3, 0.4]])
+        first = self.embedding_service.generate_embeddings_batch(["Texte en cache"])
+        
+        self.mock_model.encode.reset_mock()
+        self.mock_model.encode.return_value = np.array([[0.5, 0.6, 0.7, 0.8]])
+        embeddings = self.embedding_service.generate_embeddings_batch(
+            ["Texte en cache", "Nouveau texte", "Nouveau texte"]
+        )
+        
+        np.testing.assert_array_equal(embeddings[0], first[0])
+        np.testing.assert_array_equal(embeddings[1], embeddings[2])
+        self.mock_model.encode.assert_called_once()
+        self.assertEqual(list(self.mock_model.encode.call_args[0][0]), ["Nouveau texte"])
+    
+    def test_generate_embeddings_into(self):
+        """Test de génération d'embeddings dans un tampon préalloué"""
+        self.mock_model.encode.return_value = np.array([[0.1, 0.2, 0.3, 0.4]])
+        out = np.zeros((2, 4), dtype=np.float16)
+        
+        filled = self.embedding_service.generate_embeddings_into(iter(["Texte", ""]), out)
+        
+        self.assertEqual(filled.tolist(), [True, False])
+        np.testing.assert_allclose(out[0], [0.1, 0.2, 0.3, 0.4], rtol=1e-3)
+        np.testing.assert_array_equal(out[1], 0)
     
     def test_calculate_similarity(self):
         """Test de calcul de similarité"""
@@ -75,6 +103,38 @@ class TestEmbeddingService(unittest.TestCase):
         self.assertGreaterEqual(similarity, 0.0)
         self.assertLessEqual(similarity, 1.0)
     
+    def test_calculate_similarity_normalized(self):
+        """Test de similarité sur des embeddings déjà normalisés"""
+        embedding1 = np.array([0.1, 0.2, 0.3, 0.4], dtype=np.float32)
+        embedding2 = np.array([0.5, 0.6, 0.7, 0.8], dtype=np.float32)
+        
+        similarity = self.embedding_service.calculate_similarity(
+            embedding1 / np.linalg.norm(embedding1),
+            embedding2 / np.linalg.norm(embedding2),
+            normalized=True
+        )
+        
+        self.assertAlmostEqual(
+            similarity,
+            self.embedding_service.calculate_similarity(embedding1, embedding2),
+            places=5
+        )
+    
+    def test_calculate_similarity_quantized(self):
+        """Test de similarité sur des embeddings quantifiés en int8"""
+        embedding1 = [0.1, 0.2, 0.3, 0.4]
+        embedding2 = [0.5, 0.6, 0.7, 0.8]
+        
+        quantized1 = self.embedding_service.quantize(embedding1)
+        quantized2 = self.embedding_service.quantize(embedding2)
+        
+        self.assertEqual(quantized1[0].dtype, np.int8)
+        self.assertAlmostEqual(
+            self.embedding_service.calculate_similarity(quantized1, quantized2),
+            self.embedding_service.calculate_similarity(embedding1, embedding2),
+            places=2
+        )
+    
     def test_calculate_similarity_empty_embeddings(self):
         """Test de similarité avec embeddings vides"""
         similarity = self.embedding_service.calculate_similarity([], [])
@@ -100,6 +160,56 @@ class TestEmbeddingService(unittest.TestCase):
         # Le deuxième embedding devrait être trouvé car identique
         self.assertGreater(len(results), 0)
     
+    def test_find_most_similar_matrix(self):
+        """Test de recherche avec une matrice de candidats pré-empilée"""
+        query_embedding = [1.0, 0.0, 0.0, 0.0]
+        candidate_matrix = np.array([
+            [0.0, 1.0, 0.0, 0.0],
+            [2.0, 0.0, 0.0, 0.0],  # Même direction, norme différente
+            [1.0, 1.0, 0.0, 0.0]
+        ], dtype=np.float32)
+        
+        results = self.embedding_service.find_most_similar(
+            query_embedding, 
+            candidate_matrix, 
+            threshold=0.5
+        )
+        
+        self.assertEqual([index for index, _ in results], [1, 2])
+        self.assertAlmostEqual(results[0][1], 1.0, places=5)
+    
+    def test_find_most_similar_limit(self):
+        """Test de sélection partielle des meilleurs candidats"""
+        query_embedding = [1.0, 0.0, 0.0, 0.0]
+        candidate_matrix = np.array([
+            [1.0, 1.0, 0.0, 0.0],
+            [0.0, 1.0, 0.0, 0.0],
+            [2.0, 0.0, 0.0, 0.0],
+            [1.0, 0.5, 0.0, 0.0]
+        ], dtype=np.float32)
+        
+        results = self.embedding_service.find_most_similar(
+            query_embedding, 
+            candidate_matrix, 
+            threshold=0.0,
+            limit=2
+        )
+        
+        self.assertEqual([index for index, _ in results], [2, 3])
+    
+    def test_embedding_index_search(self):
+        """Test de l'index en mémoire (croissance du tampon et recherche)"""
+        index = EmbeddingIndex(dimension=4, initial_capacity=1)
+        index.add([0.0, 1.0, 0.0, 0.0])
+        index.add_batch(np.array([[2.0, 0.0, 0.0, 0.0], [1.0, 1.0, 0.0, 0.0]]))
+        
+        self.assertEqual(len(index), 3)
+        
+        results = self.embedding_service.find_most_similar([1.0, 0.0, 0.0, 0.0], index, threshold=0.5)
+        
+        self.assertEqual([position for position, _ in results], [1, 2])
+        self.assertAlmostEqual(results[0][1], 1.0, places=5)
+    
     def test_validate_embedding_valid(self):
         """Test de validation d'embedding valide"""
         embedding = [0.1, 0.2, 0.3, 0.4]
@@ -123,7 +233,7 @@ class TestEmbeddingService(unittest.TestCase):
         dimension = self.embedding_service.get_embedding_dimension()
         
         self.assertIsInstance(dimension, int)
-        self.assertGreater(dimension, 0)
+        self.assertEqual(dimension, 4)
 
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,57 @@
+"""
+Tests unitaires pour le découpage en chunks du service de traitement de fichiers
+"""
+
+import unittest
+from unittest.mock import patch
+
+from services import _file_extraction
+
+class TestChunkWindows(unittest.TestCase):
+    """Tests pour le calcul des fenêtres de chunks (memchunk et Python pur)"""
+    
+    CHUNK_SIZE = 1000
+    CHUNK_OVERLAP = 200
+    
+    TEXTS = {
+        "sans_delimiteur": "a" * 3000,
+        "accents": "Élément réglé à côté de l'été. " * 150,
+        "mots": "réponse " * 500,
+    }
+    
+    def windows(self, text):
+        """Fenêtres calculées avec la configuration du test"""
+        return list(_file_extraction._chunk_windows(text, self.CHUNK_SIZE, self.CHUNK_OVERLAP))
+    
+    def check_windows(self, text, windows):
+        """Vérifie la taille des fenêtres et la couverture complète du texte"""
+        self.assertGreater(len(windows), 1)
+        covered = 0
+        for start, end in windows:
+            self.assertLessEqual(len(text[start:end]), self.CHUNK_SIZE)
+            self.assertLessEqual(start, covered)
+            covered = max(covered, end)
+        self.assertGreaterEqual(covered, len(text))
+    
+    def test_python_windows(self):
+        """Test du découpage en Python pur"""
+        with patch.object(_file_extraction, "Chunker", None):
+            for name, text in self.TEXTS.items():
+                with self.subTest(text=name):
+                    self.check_windows(text, self.windows(text))
+    
+    @unittest.skipIf(_file_extraction.Chunker is None, "memchunk non installé")
+    def test_memchunk_windows_match_python_sizes(self):
+        """Test du découpage memchunk sur les mêmes textes que le chemin Python"""
+        for name, text in self.TEXTS.items():
+            with self.subTest(text=name):
+                memchunk_windows = self.windows(text)
+                with patch.object(_file_extraction, "Chunker", None):
+                    python_windows = self.windows(text)
+                
+                self.check_windows(text, memchunk_windows)
+                # Nombre de chunks comparable : même taille visée en caractères
+                self.assertLessEqual(abs(len(memchunk_windows) - len(python_windows)), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+"""
+Tests unitaires pour l'extraction de JSON dans du texte
+"""
+
+import unittest
+
+from utils.json_utils import _find_object_end, extract_all_json, extract_json_from_text
+
+class TestExtractJson(unittest.TestCase):
+    """Tests pour _find_object_end, extract_json_from_text et extract_all_json"""
+    
+    def test_escaped_quotes(self):
+        """Test de guillemets échappés (suivis d'une accolade) dans une chaîne"""
+        text = 'Réponse : {"reponse": "il dit \\"}\\" ici", "confiance": 0.9} fin'
+        
+        self.assertEqual(_find_object_end(text, text.index('{')), text.rindex('}'))
+        self.assertEqual(extract_json_from_text(text), {"reponse": 'il dit "}" ici', "confiance": 0.9})
+    
+    def test_escaped_backslash_before_closing_quote(self):
+        """Test d'une barre oblique inverse échappée juste avant la fin de la chaîne"""
+        text = '{"chemin": "C:\\\\"} {"b": 1}'
+        
+        self.assertEqual(extract_json_from_text(text), {"chemin": "C:\\"})
+        self.assertEqual(extract_all_json(text), [{"chemin": "C:\\"}, {"b": 1}])
+    
+    def test_braces_inside_strings(self):
+        """Test d'accolades à l'intérieur des chaînes et d'objets imbriqués"""
+        text = 'avant {"a": "{ } }", "b": {"c": [1, {"d": "}"}]}} après'
+        
+        self.assertEqual(extract_json_from_text(text), {"a": "{ } }", "b": {"c": [1, {"d": "}"}]}})
+    
+    def test_invalid_leading_object(self):
+        """Test d'un bloc {...} invalide avant un objet JSON valide"""
+        text = 'Format {reponse, confiance} : {"reponse": "Oui", "confiance": 0.8}'
+        
+        self.assertEqual(extract_json_from_text(text), {"reponse": "Oui", "confiance": 0.8})
+        self.assertEqual(extract_all_json(text), [{"reponse": "Oui", "confiance": 0.8}])
+    
+    def test_missing_closing_brace(self):
+        """Test d'un objet JSON non fermé"""
+        text = 'Réponse : {"reponse": "Oui", "confiance": 0.8'
+        
+        self.assertEqual(_find_object_end(text, text.index('{')), -1)
+        self.assertIsNone(extract_json_from_text(text))
+        self.assertEqual(extract_all_json(text), [])
+    
+    def test_no_json(self):
+        """Test d'un texte sans JSON ou d'une entrée non textuelle"""
+        self.assertIsNone(extract_json_from_text("Aucune accolade ici"))
+        self.assertIsNone(extract_json_from_text(None))
+
+if __name__ == '__main__':
+    unittest.main()
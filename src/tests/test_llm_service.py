@@ -0,0 +1,185 @@
+"""
+Tests unitaires pour le service LLM
+"""
+
+import dataclasses
+import json
+import unittest
+from unittest.mock import Mock, patch
+
+import requests
+
+from config.settings import settings
+from services import llm_service
+from services.llm_service import LLMService
+
+def sse_response(deltas, done=True, extra_lines=()):
+    """Crée une réponse HTTP simulée émettant les fragments au format SSE"""
+    lines = [b": keep-alive", b""]
+    for delta in deltas:
+        event = {"choices": [{"delta": {"content": delta}}]}
+        lines.append(b"data: " + json.dumps(event).encode('utf-8'))
+    if done:
+        lines.append(b"data: [DONE]")
+    lines.extend(extra_lines)
+    
+    response = Mock()
+    response.status_code = 200
+    response.consumed = []
+    
+    def iter_lines():
+        for line in lines:
+            response.consumed.append(line)
+            yield line
+    
+    response.iter_lines.side_effect = iter_lines
+    return response
+
+class TestLLMService(unittest.TestCase):
+    """Tests pour le service LLM"""
+    
+    def setUp(self):
+        """Initialisation avant chaque test"""
+        with patch.object(LLMService, '_test_connection', return_value=True):
+            self.llm_service = LLMService()
+        self.llm_service._session = Mock()
+    
+    def test_read_stream_json_split_across_deltas(self):
+        """Test d'un JSON reçu en plusieurs fragments, lecture arrêtée dès qu'il est complet"""
+        response = sse_response(['Voici : {"reponse": "Oui', '", "confiance"', ': 0.9', '}', ' et la suite'])
+        
+        content, json_data = self.llm_service._read_stream(response)
+        
+        self.assertEqual(json_data, {"reponse": "Oui", "confiance": 0.9})
+        self.assertEqual(content, 'Voici : {"reponse": "Oui", "confiance": 0.9}')
+        self.assertFalse(any(b"et la suite" in line for line in response.consumed))
+        response.close.assert_called_once()
+    
+    def test_read_stream_brace_inside_string(self):
+        """Test d'une accolade fermante à l'intérieur d'une chaîne JSON"""
+        response = sse_response(['{"reponse": "a } b', '", "confiance": 0.5}'])
+        
+        content, json_data = self.llm_service._read_stream(response)
+        
+        self.assertEqual(json_data, {"reponse": "a } b", "confiance": 0.5})
+    
+    def test_read_stream_done_without_json(self):
+        """Test d'un flux terminé par [DONE] sans JSON"""
+        response = sse_response(['Pas de ', 'JSON ici'], extra_lines=[b"data: ignored"])
+        
+        content, json_data = self.llm_service._read_stream(response)
+        
+        self.assertEqual(content, "Pas de JSON ici")
+        self.assertIsNone(json_data)
+        self.assertNotIn(b"data: ignored", response.consumed)
+        response.close.assert_called_once()
+    
+    def test_generate_response_falls_back_to_extract_json(self):
+        """Test du repli sur extract_json_from_text quand le flux n'a pas fourni de JSON"""
+        self.llm_service.stream = True
+        self.llm_service._session.post.return_value = Mock(status_code=200)
+        content = 'Réponse : {"reponse": "Texte", "confiance": 0.7, "sources": ["doc.docx"]} fin'
+        
+        with patch.object(LLMService, '_read_stream', return_value=(content, None)):
+            response = self.llm_service.generate_response("Question ?", ["Contexte"], max_retries=1, use_cache=False)
+        
+        self.assertIsNotNone(response)
+        self.assertEqual(response.reponse, "Texte")
+        self.assertEqual(response.confiance, 0.7)
+        self.assertEqual(response.sources, ["doc.docx"])
+    
+    def test_confidence_given_as_string(self):
+        """Test d'une confiance renvoyée sous forme de chaîne ("0.85")"""
+        self.assertTrue(llm_service._is_valid_response({"reponse": "Oui", "confiance": "0.85"}))
+        self.assertFalse(llm_service._is_valid_response({"reponse": "Oui"}))
+
+class TestLLMCircuitBreaker(unittest.TestCase):
+    """Tests pour le disjoncteur du service LLM"""
+    
+    def setUp(self):
+        """Initialisation avant chaque test"""
+        test_settings = dataclasses.replace(settings, LLM_CIRCUIT_THRESHOLD=3, LLM_CIRCUIT_COOLDOWN=30.0)
+        settings_patcher = patch.object(llm_service, 'settings', test_settings)
+        settings_patcher.start()
+        self.addCleanup(settings_patcher.stop)
+        
+        self.now = 1000.0
+        clock_patcher = patch.object(llm_service.time, 'monotonic', side_effect=lambda: self.now)
+        clock_patcher.start()
+        self.addCleanup(clock_patcher.stop)
+        
+        with patch.object(LLMService, '_test_connection', return_value=True):
+            self.llm_service = LLMService()
+        self.llm_service._session = Mock()
+        self.llm_service.stream = False
+    
+    def ask(self):
+        """Pose une question en une seule tentative"""
+        return self.llm_service.generate_response("Question ?", ["Contexte"], max_retries=1, use_cache=False)
+    
+    def test_server_errors_open_circuit_at_threshold(self):
+        """Test de l'ouverture du disjoncteur après LLM_CIRCUIT_THRESHOLD erreurs serveur"""
+        self.llm_service._session.post.return_value = Mock(status_code=503, text="indisponible")
+        
+        for _ in range(2):
+            self.ask()
+        self.assertFalse(self.llm_service._circuit_is_open())
+        
+        self.ask()
+        self.assertTrue(self.llm_service._circuit_is_open())
+        
+        calls = self.llm_service._session.post.call_count
+        self.assertIsNone(self.ask())
+        self.assertEqual(self.llm_service._session.post.call_count, calls)
+    
+    def test_connection_errors_and_timeouts_count_as_failures(self):
+        """Test de la prise en compte des timeouts et erreurs de connexion"""
+        self.llm_service._session.post.side_effect = [
+            requests.exceptions.Timeout(),
+            requests.exceptions.ConnectionError("refusée"),
+            requests.exceptions.Timeout(),
+        ]
+        
+        for _ in range(3):
+            self.ask()
+        
+        self.assertTrue(self.llm_service._circuit_is_open())
+    
+    def test_client_errors_do_not_open_circuit(self):
+        """Test des erreurs client (4xx) qui ne concernent que la question posée"""
+        self.llm_service._session.post.return_value = Mock(status_code=400, text="contexte trop long")
+        
+        for _ in range(5):
+            self.assertIsNone(self.ask())
+        
+        self.assertFalse(self.llm_service._circuit_is_open())
+        self.assertEqual(self.llm_service._consecutive_failures, 0)
+    
+    def test_circuit_closes_after_cooldown(self):
+        """Test de la reprise des appels une fois le délai de suspension écoulé"""
+        self.llm_service._session.post.return_value = Mock(status_code=500, text="erreur")
+        for _ in range(3):
+            self.ask()
+        self.assertTrue(self.llm_service._circuit_is_open())
+        
+        self.now += 29.0
+        self.assertTrue(self.llm_service._circuit_is_open())
+        self.now += 2.0
+        self.assertFalse(self.llm_service._circuit_is_open())
+    
+    def test_success_resets_failure_count(self):
+        """Test de la remise à zéro du compteur après une réponse de l'endpoint"""
+        failure = Mock(status_code=502, text="erreur")
+        body = {"choices": [{"message": {"content": '{"reponse": "Oui", "confiance": 0.8}'}}]}
+        success = Mock(status_code=200, content=json.dumps(body).encode('utf-8'))
+        success.json.return_value = body
+        self.llm_service._session.post.side_effect = [failure, failure, success, failure, failure]
+        
+        for _ in range(5):
+            self.ask()
+        
+        self.assertFalse(self.llm_service._circuit_is_open())
+        self.assertEqual(self.llm_service._consecutive_failures, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,5 +4,6 @@ Utilitaires pour le système AOR
 
 from .file_utils import *
 from .json_utils import *
+from .logging_utils import *
 
-__all__ = ["file_utils", "json_utils"] 
\ No newline at end of file
+__all__ = ["file_utils", "json_utils", "logging_utils"] 
\ No newline at end of file
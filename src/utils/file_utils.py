@@ -2,18 +2,40 @@
 Utilitaires pour la manipulation de fichiers
 """
 
+import io
 import os
+import mmap
 import hashlib
-import uuid
-from typing import List, Optional
+import shutil
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Union
 from pathlib import Path
 import logging
 
+try:
+    from xxhash import xxh3_128
+except ImportError:  # xxhash est optionnel : repli sur blake3 puis hashlib.blake2b
+    xxh3_128 = None
+
+try:
+    import blake3
+except ImportError:  # blake3 est optionnel : repli sur hashlib.blake2b
+    blake3 = None
+
 logger = logging.getLogger(__name__)
 
+# Facteur de conversion octets -> MB (1 / 1024²)
+BYTES_TO_MB = 1 / (1024 * 1024)
+
+# Caractères interdits dans les noms de fichiers Windows, remplacés en une seule passe
+_INVALID_FILENAME_TABLE = str.maketrans({char: '_' for char in '<>:"/\\|?*'})
+
 def generate_chunk_id(content: str, source_file: str, chunk_index: int) -> str:
     """
-    Génère un identifiant unique pour un chunk
+    Génère un identifiant déterministe pour un chunk
+    
+    Le même chunk produit toujours le même identifiant, ce qui permet de
+    ré-indexer un fichier par upsert sans créer de doublons.
     
     Args:
         content: Contenu du chunk
@@ -21,12 +43,17 @@ def generate_chunk_id(content: str, source_file: str, chunk_index: int) -> str:
         chunk_index: Index du chunk
         
     Returns:
-        Identifiant unique du chunk
+        Identifiant du chunk
     """
-    # Créer un hash du contenu et des métadonnées
-    hash_input = f"{content[:100]}_{source_file}_{chunk_index}"
-    hash_value = hashlib.md5(hash_input.encode()).hexdigest()
-    return f"chunk_{hash_value}_{uuid.uuid4().hex[:8]}"
+    # Créer un hash non cryptographique du contenu complet et des métadonnées (xxh3, BLAKE3 ou BLAKE2b)
+    hash_input = f"{source_file}\0{chunk_index}\0{content}".encode()
+    if xxh3_128 is not None:
+        hash_value = xxh3_128(hash_input).hexdigest()
+    elif blake3 is not None:
+        hash_value = blake3.blake3(hash_input).hexdigest(length=16)
+    else:
+        hash_value = hashlib.blake2b(hash_input, digest_size=16).hexdigest()
+    return f"chunk_{hash_value}"
 
 def ensure_directory_exists(directory_path: str) -> bool:
     """
@@ -71,19 +98,25 @@ def is_supported_file(file_path: str, supported_extensions: List[str]) -> bool:
     file_extension = get_file_extension(file_path)
     return file_extension in supported_extensions
 
-def get_file_size_mb(file_path: str) -> float:
+def get_file_size_mb(file_path: Union[str, os.PathLike, os.DirEntry, os.stat_result]) -> float:
     """
     Récupère la taille d'un fichier en MB
     
     Args:
-        file_path: Chemin du fichier
+        file_path: Chemin du fichier, entrée os.scandir ou résultat d'os.stat
+            déjà obtenu (aucun appel système supplémentaire dans ce cas)
         
     Returns:
         Taille du fichier en MB
     """
     try:
-        size_bytes = os.path.getsize(file_path)
-        return size_bytes / (1024 * 1024)
+        if isinstance(file_path, os.stat_result):
+            size_bytes = file_path.st_size
+        elif isinstance(file_path, os.DirEntry):
+            size_bytes = file_path.stat().st_size
+        else:
+            size_bytes = os.stat(file_path).st_size
+        return size_bytes * BYTES_TO_MB
     except Exception as e:
         logger.error(f"Erreur lors du calcul de la taille du fichier {file_path}: {e}")
         return 0.0
@@ -104,14 +137,40 @@ def create_backup_file(file_path: str) -> Optional[str]:
             return None
             
         backup_path = f"{file_path}.backup"
-        import shutil
-        shutil.copy2(file_path, backup_path)
+        _copy_file_contents(file_path, backup_path)
+        shutil.copystat(file_path, backup_path)
         logger.info(f"Sauvegarde créée : {backup_path}")
         return backup_path
     except Exception as e:
         logger.error(f"Erreur lors de la création de la sauvegarde de {file_path}: {e}")
         return None
 
+def _copy_file_contents(source_path: str, destination_path: str) -> None:
+    """
+    Copie le contenu d'un fichier dans le noyau (copy_file_range), sans passer par l'espace utilisateur
+    
+    Repli sur shutil.copyfile (sendfile sous Linux) si copy_file_range est
+    indisponible ou refusé (autre système de fichiers, noyau ancien...).
+    
+    Args:
+        source_path: Fichier à copier
+        destination_path: Fichier de destination (écrasé)
+    """
+    if hasattr(os, "copy_file_range"):
+        try:
+            with open(source_path, 'rb') as source, open(destination_path, 'wb') as destination:
+                remaining = os.fstat(source.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(source.fileno(), destination.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+            if remaining <= 0:
+                return
+        except OSError:
+            pass
+    shutil.copyfile(source_path, destination_path)
+
 def clean_filename(filename: str) -> str:
     """
     Nettoie un nom de fichier pour qu'il soit compatible avec le système de fichiers
@@ -122,18 +181,11 @@ def clean_filename(filename: str) -> str:
     Returns:
         Nom de fichier nettoyé
     """
-    # Caractères interdits dans les noms de fichiers Windows
-    invalid_chars = '<>:"/\\|?*'
-    for char in invalid_chars:
-        filename = filename.replace(char, '_')
-    
-    # Supprimer les espaces en début et fin
-    filename = filename.strip()
+    # Remplacer les caractères interdits dans les noms de fichiers Windows
+    filename = filename.translate(_INVALID_FILENAME_TABLE)
     
-    # Remplacer les espaces multiples par un seul espace
-    filename = ' '.join(filename.split())
-    
-    return filename
+    # Supprimer les espaces en début et fin et remplacer les espaces multiples par un seul
+    return ' '.join(filename.split())
 
 def get_relative_path(file_path: str, base_path: str) -> str:
     """
@@ -163,13 +215,89 @@ def count_files_in_directory(directory_path: str, extensions: Optional[List[str]
     Returns:
         Nombre de fichiers
     """
+    # Extensions normalisées une seule fois (minuscules, avec le point)
+    ext_set = None if extensions is None else {'.' + ext.lower().lstrip('.') for ext in extensions}
+    
     count = 0
     try:
-        for root, dirs, files in os.walk(directory_path):
-            for file in files:
-                if extensions is None or get_file_extension(file) in extensions:
-                    count += 1
+        for name in _iter_file_names(directory_path):
+            if ext_set is None:
+                count += 1
+                continue
+            # Même règle que Path.suffix : un point initial ne marque pas une extension
+            dot = name.rfind('.')
+            if dot > 0 and name[dot:].lower() in ext_set:
+                count += 1
     except Exception as e:
         logger.error(f"Erreur lors du comptage des fichiers dans {directory_path}: {e}")
     
-    return count 
\ No newline at end of file
+    return count 
+
+def _iter_file_names(directory_path: str) -> Iterator[str]:
+    """
+    Parcourt récursivement un répertoire et produit le nom de chaque fichier
+    
+    Utilise os.scandir (le type de chaque entrée est connu sans stat
+    supplémentaire) ; comme os.walk, les liens symboliques vers des
+    répertoires ne sont pas suivis et les répertoires illisibles sont ignorés.
+    
+    Args:
+        directory_path: Chemin du répertoire
+        
+    Returns:
+        Itérateur sur les noms de fichiers
+    """
+    pending = [directory_path]
+    while pending:
+        try:
+            with os.scandir(pending.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif entry.is_file():
+                        yield entry.name
+        except OSError:
+            continue
+
+class _MappedFile(mmap.mmap):
+    """Projection mémoire exposant l'interface de fichier attendue par zipfile"""
+    
+    def seekable(self) -> bool:
+        return True
+    
+    def readable(self) -> bool:
+        return True
+
+@contextmanager
+def mapped_file(file_path: str) -> Iterator[Union[mmap.mmap, io.BytesIO]]:
+    """
+    Projette un fichier en mémoire (lecture seule) pour le lire sans appel système par lecture
+    
+    L'objet mmap se comporte comme un fichier binaire (read/seek/tell) et
+    peut être passé directement à zipfile, python-docx ou openpyxl.
+    
+    Args:
+        file_path: Chemin du fichier
+        
+    Returns:
+        Fichier projeté en mémoire, fermé en sortie du bloc with
+    """
+    fd = os.open(file_path, os.O_RDONLY)
+    try:
+        # mmap refuse les fichiers vides : un tampon mémoire vide en tient lieu
+        if os.fstat(fd).st_size == 0:
+            mapped = None
+        else:
+            mapped = _MappedFile(fd, 0, access=mmap.ACCESS_READ)
+    finally:
+        os.close(fd)  # Le mapping reste valide après fermeture du descripteur
+    if mapped is None:
+        with io.BytesIO(b"") as empty:
+            yield empty
+        return
+    try:
+        if hasattr(mapped, "madvise"):
+            mapped.madvise(mmap.MADV_SEQUENTIAL)
+        yield mapped
+    finally:
+        mapped.close()
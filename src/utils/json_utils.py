@@ -4,11 +4,146 @@ Utilitaires pour la manipulation JSON
 
 import json
 import logging
-from typing import Any, Dict, List, Optional
+import os
+import re
+import threading
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
 from pydantic import BaseModel
 
+try:
+    import orjson
+except ImportError:  # orjson est optionnel : repli sur le module json standard
+    orjson = None
+
+# Options orjson précalculées (tableaux numpy et clés non textuelles sérialisés nativement)
+if orjson is not None:
+    _ORJSON_OPTS_COMPACT = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+    _ORJSON_OPTS_INDENT = _ORJSON_OPTS_COMPACT | orjson.OPT_INDENT_2
+
+try:
+    import msgspec
+except ImportError:  # msgspec est optionnel : seuls les modèles Pydantic sont alors gérés
+    msgspec = None
+
+try:
+    import ijson
+except ImportError:  # ijson est optionnel : repli sur un chargement complet du fichier
+    ijson = None
+
+try:
+    import simdjson
+except ImportError:  # pysimdjson est optionnel : repli sur orjson ou json
+    simdjson = None
+
 logger = logging.getLogger(__name__)
 
+# Taille du tampon de lecture des fichiers JSON (1 Mio)
+READ_BUFFER_SIZE = 1 << 20
+
+# Un parseur simdjson par thread (un parseur réutilise son tampon et n'est pas thread-safe)
+_SIMDJSON_LOCAL = threading.local()
+
+# Taille à partir de laquelle un fichier JSON est lu par simdjson (64 Kio)
+SIMDJSON_MIN_FILE_SIZE = 64 * 1024
+
+def _simdjson_parser() -> "simdjson.Parser":
+    """
+    Retourne le parseur simdjson du thread courant (créé au premier appel)
+    
+    Returns:
+        Parseur simdjson réutilisé entre les appels
+    """
+    parser = getattr(_SIMDJSON_LOCAL, "parser", None)
+    if parser is None:
+        parser = _SIMDJSON_LOCAL.parser = simdjson.Parser()
+    return parser
+
+def _export_simdjson(document: Any) -> Any:
+    """
+    Convertit un document simdjson en objets Python natifs
+    
+    Le document est invalidé au parse suivant du même parseur : il est
+    donc converti entièrement (dict/list modifiables par l'appelant).
+    
+    Args:
+        document: Résultat de Parser.parse ou Parser.load
+        
+    Returns:
+        dict, list ou valeur scalaire
+    """
+    if isinstance(document, simdjson.Object):
+        return document.as_dict()
+    if isinstance(document, simdjson.Array):
+        return document.as_list()
+    return document
+
+def _parse_json_document(json_part: str) -> Any:
+    """
+    Parse un document JSON complet avec le parseur le plus rapide disponible
+    
+    Args:
+        json_part: Document JSON
+        
+    Returns:
+        Objet Python décodé (dict/list natifs)
+        
+    Raises:
+        ValueError: Si le document n'est pas du JSON valide
+    """
+    if simdjson is not None:
+        return _export_simdjson(_simdjson_parser().parse(json_part.encode('utf-8')))
+    if orjson is not None:
+        return orjson.loads(json_part)
+    return json.loads(json_part)
+
+# Caractères structurants pour localiser la fin d'un objet (accolades, guillemets, échappements)
+_STRUCTURAL_RE = re.compile(r'[{}"\\]')
+
+def _find_object_end(text: str, start_idx: int) -> int:
+    """
+    Localise l'accolade fermante qui équilibre celle située à start_idx
+    
+    Seuls les caractères structurants sont visités (recherche faite par le
+    moteur d'expressions régulières) ; les accolades à l'intérieur des
+    chaînes JSON sont ignorées.
+    
+    Args:
+        text: Texte contenant l'objet
+        start_idx: Position de l'accolade ouvrante
+        
+    Returns:
+        Position de l'accolade fermante, ou -1 si l'objet n'est pas fermé
+    """
+    depth = 0
+    in_string = False
+    escaped_pos = -1
+    for match in _STRUCTURAL_RE.finditer(text, start_idx):
+        pos = match.start()
+        if pos == escaped_pos:
+            continue
+        char = text[pos]
+        if in_string:
+            if char == '\\':
+                escaped_pos = pos + 1
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return pos
+    return -1
+
+# Décodeur réutilisé pour extraire un objet JSON au milieu d'un texte
+_JSON_DECODER = json.JSONDecoder()
+
+# Premiers caractères possibles d'un objet ou d'un tableau JSON (texte ou octets)
+_JSON_CONTAINER_STARTS = frozenset({'{', '[', b'{', b'['})
+
 def safe_json_loads(json_string: str) -> Optional[Dict[str, Any]]:
     """
     Charge une chaîne JSON de manière sécurisée
@@ -19,14 +154,21 @@ def safe_json_loads(json_string: str) -> Optional[Dict[str, Any]]:
     Returns:
         Dictionnaire parsé ou None en cas d'erreur
     """
+    # Pré-contrôle : une entrée qui ne commence ni par un objet ni par un tableau
+    # est rejetée sans tenter de parsing (ni construire d'exception)
+    if isinstance(json_string, (str, bytes)):
+        stripped = json_string.lstrip()
+        if not stripped or stripped[:1] not in _JSON_CONTAINER_STARTS:
+            logger.error("Erreur lors du parsing JSON: le contenu n'est ni un objet ni un tableau JSON")
+            return None
+    
     try:
+        if orjson is not None:
+            return orjson.loads(json_string)
         return json.loads(json_string)
-    except json.JSONDecodeError as e:
+    except (ValueError, TypeError) as e:  # JSONDecodeError/UnicodeDecodeError (ValueError), entrée non textuelle
         logger.error(f"Erreur lors du parsing JSON: {e}")
         return None
-    except Exception as e:
-        logger.error(f"Erreur inattendue lors du parsing JSON: {e}")
-        return None
 
 def safe_json_dumps(obj: Any, indent: int = 2) -> Optional[str]:
     """
@@ -39,14 +181,19 @@ def safe_json_dumps(obj: Any, indent: int = 2) -> Optional[str]:
     Returns:
         Chaîne JSON ou None en cas d'erreur
     """
+    # orjson ne sait indenter que sur 2 espaces ; les autres indentations passent par json
+    if orjson is not None and indent in (None, 2):
+        try:
+            option = _ORJSON_OPTS_INDENT if indent else _ORJSON_OPTS_COMPACT
+            return orjson.dumps(obj, option=option).decode('utf-8')
+        except TypeError:
+            pass  # Type non géré par orjson : repli sur json
+    
     try:
         return json.dumps(obj, indent=indent, ensure_ascii=False)
-    except TypeError as e:
+    except (TypeError, ValueError) as e:  # Type non sérialisable, référence circulaire
         logger.error(f"Erreur lors de la sérialisation JSON: {e}")
         return None
-    except Exception as e:
-        logger.error(f"Erreur inattendue lors de la sérialisation JSON: {e}")
-        return None
 
 def extract_json_from_text(text: str) -> Optional[Dict[str, Any]]:
     """
@@ -58,19 +205,84 @@ def extract_json_from_text(text: str) -> Optional[Dict[str, Any]]:
     Returns:
         Dictionnaire JSON extrait ou None si non trouvé
     """
+    if not isinstance(text, str):
+        return None
+    
+    start_idx = text.find('{')
+    if start_idx == -1:
+        return None
+    
+    # Cas courant : l'objet qui commence à la première accolade, délimité par
+    # équilibrage des accolades puis parsé d'un bloc par le parseur natif
+    end_idx = _find_object_end(text, start_idx)
+    if end_idx != -1:
+        try:
+            obj = _parse_json_document(text[start_idx:end_idx + 1])
+            if isinstance(obj, dict):
+                return obj
+        except ValueError:  # JSONDecodeError (json, orjson) et erreurs simdjson en héritent
+            pass
+    
+    # Sinon, décoder à partir de chaque accolade ouvrante : raw_decode parcourt le
+    # texte une seule fois (sans retour arrière) et ignore ce qui suit l'objet
+    while start_idx != -1:
+        try:
+            obj, _ = _JSON_DECODER.raw_decode(text, start_idx)
+            if isinstance(obj, dict):
+                return obj
+        except json.JSONDecodeError:
+            pass
+        start_idx = text.find('{', start_idx + 1)
+    
+    return None
+
+def extract_all_json(text: str) -> List[Dict[str, Any]]:
+    """
+    Extrait tous les objets JSON de premier niveau présents dans un texte
+    
+    Le texte est parcouru une seule fois : chaque objet est délimité par
+    équilibrage des accolades puis parsé, et la recherche reprend après lui.
+    
+    Args:
+        text: Texte contenant potentiellement plusieurs objets JSON
+        
+    Returns:
+        Liste des dictionnaires extraits, dans l'ordre du texte
+    """
+    objects = []
     try:
-        # Chercher des accolades ouvrantes et fermantes
         start_idx = text.find('{')
-        end_idx = text.rfind('}')
-        
-        if start_idx != -1 and end_idx != -1 and end_idx > start_idx:
-            json_part = text[start_idx:end_idx + 1]
-            return safe_json_loads(json_part)
-        
-        return None
+        while start_idx != -1:
+            end_idx = _find_object_end(text, start_idx)
+            if end_idx == -1:
+                break
+            try:
+                obj = _parse_json_document(text[start_idx:end_idx + 1])
+            except ValueError:
+                obj = None
+            if isinstance(obj, dict):
+                objects.append(obj)
+                start_idx = text.find('{', end_idx + 1)
+            else:
+                # Bloc invalide : chercher un objet à partir de l'accolade suivante
+                start_idx = text.find('{', start_idx + 1)
     except Exception as e:
-        logger.error(f"Erreur lors de l'extraction JSON: {e}")
-        return None
+        logger.error(f"Erreur lors de l'extraction des objets JSON: {e}")
+    
+    return objects
+
+@lru_cache(maxsize=128)
+def _required_key_set(required_keys: Tuple[str, ...]) -> FrozenSet[str]:
+    """
+    Construit (une fois par liste de clés) l'ensemble des clés requises
+    
+    Args:
+        required_keys: Clés requises
+        
+    Returns:
+        Ensemble figé des clés
+    """
+    return frozenset(required_keys)
 
 def validate_json_structure(data: Dict[str, Any], required_keys: List[str]) -> bool:
     """
@@ -86,24 +298,58 @@ def validate_json_structure(data: Dict[str, Any], required_keys: List[str]) -> b
     if not isinstance(data, dict):
         return False
     
-    return all(key in data for key in required_keys)
+    # Test d'inclusion fait en C : une recherche dans la table de hachage du
+    # dictionnaire par clé requise (issubset construirait un ensemble de toutes ses clés)
+    return data.keys() >= _required_key_set(tuple(required_keys))
 
 def pydantic_to_dict(model: BaseModel) -> Dict[str, Any]:
     """
-    Convertit un modèle Pydantic en dictionnaire
+    Convertit un modèle Pydantic (ou une Struct msgspec) en dictionnaire
     
     Args:
-        model: Modèle Pydantic
+        model: Modèle Pydantic ou msgspec.Struct
         
     Returns:
         Dictionnaire représentant le modèle
     """
     try:
+        # Struct msgspec : conversion en une passe C
+        if msgspec is not None and isinstance(model, msgspec.Struct):
+            return msgspec.to_builtins(model)
+        
+        # model_dump (pydantic v2, sérialiseur natif) ; .dict() pour pydantic v1
+        model_dump = getattr(model, "model_dump", None)
+        if model_dump is not None:
+            return model_dump()
         return model.dict()
-    except Exception as e:
+    except (ValueError, TypeError, AttributeError) as e:  # Erreurs de sérialisation, objet qui n'est pas un modèle
         logger.error(f"Erreur lors de la conversion Pydantic vers dict: {e}")
         return {}
 
+def pydantic_to_json_bytes(model: BaseModel, indent: Optional[int] = None) -> Optional[bytes]:
+    """
+    Sérialise un modèle Pydantic (ou une Struct msgspec) directement en JSON (octets UTF-8)
+    
+    Args:
+        model: Modèle Pydantic ou msgspec.Struct
+        indent: Indentation pour le formatage (JSON compact si None)
+        
+    Returns:
+        JSON encodé en UTF-8 ou None en cas d'erreur
+    """
+    try:
+        # Une seule passe du sérialiseur natif, sans dictionnaire Python intermédiaire
+        if msgspec is not None and isinstance(model, msgspec.Struct):
+            data = msgspec.json.encode(model)
+            return msgspec.json.format(data, indent=indent) if indent else data
+        model_dump_json = getattr(model, "model_dump_json", None)
+        if model_dump_json is not None:
+            return model_dump_json(indent=indent).encode('utf-8')
+        return model.json(indent=indent, ensure_ascii=False).encode('utf-8')
+    except Exception as e:
+        logger.error(f"Erreur lors de la sérialisation JSON du modèle Pydantic: {e}")
+        return None
+
 def save_json_to_file(data: Any, file_path: str, indent: int = 2) -> bool:
     """
     Sauvegarde des données en JSON dans un fichier
@@ -116,18 +362,58 @@ def save_json_to_file(data: Any, file_path: str, indent: int = 2) -> bool:
     Returns:
         True si la sauvegarde a réussi, False sinon
     """
-    try:
+    payload = None
+    # orjson ne sait indenter que sur 2 espaces ; les autres indentations passent par safe_json_dumps
+    if orjson is not None and indent in (None, 2):
+        # Sérialisation native des tableaux numpy, directement en octets UTF-8
+        try:
+            payload = orjson.dumps(data, option=_ORJSON_OPTS_INDENT if indent else _ORJSON_OPTS_COMPACT)
+        except TypeError:
+            pass  # Type non géré par orjson : repli sur safe_json_dumps
+    if payload is None:
         json_string = safe_json_dumps(data, indent)
         if json_string is None:
             return False
-            
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(json_string)
+        payload = json_string.encode('utf-8')
+    
+    try:
+        with open(file_path, 'wb') as f:
+            f.write(payload)
+    except OSError as e:
+        logger.error(f"Erreur lors de la sauvegarde JSON dans {file_path}: {e}")
+        return False
+    
+    logger.info(f"Données JSON sauvegardées dans {file_path}")
+    return True
+
+def save_model_to_file(model: BaseModel, file_path: str, indent: Optional[int] = 2) -> bool:
+    """
+    Sauvegarde un modèle Pydantic (ou une Struct msgspec) en JSON dans un fichier
+    
+    Le modèle est sérialisé directement en octets puis écrit en un seul appel,
+    sans passer par un dictionnaire intermédiaire (pydantic_to_dict puis
+    save_json_to_file).
+    
+    Args:
+        model: Modèle Pydantic ou msgspec.Struct
+        file_path: Chemin du fichier de sortie
+        indent: Indentation pour le formatage
         
-        logger.info(f"Données JSON sauvegardées dans {file_path}")
+    Returns:
+        True si la sauvegarde a réussi, False sinon
+    """
+    try:
+        data = pydantic_to_json_bytes(model, indent)
+        if data is None:
+            return False
+        
+        with open(file_path, 'wb') as f:
+            f.write(data)
+        
+        logger.info(f"Modèle JSON sauvegardé dans {file_path}")
         return True
     except Exception as e:
-        logger.error(f"Erreur lors de la sauvegarde JSON dans {file_path}: {e}")
+        logger.error(f"Erreur lors de la sauvegarde du modèle JSON dans {file_path}: {e}")
         return False
 
 def load_json_from_file(file_path: str) -> Optional[Dict[str, Any]]:
@@ -141,9 +427,17 @@ def load_json_from_file(file_path: str) -> Optional[Dict[str, Any]]:
         Dictionnaire chargé ou None en cas d'erreur
     """
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        return data
+        # Gros fichiers : lecture et indexation structurelle SIMD par simdjson
+        if simdjson is not None and os.stat(file_path).st_size > SIMDJSON_MIN_FILE_SIZE:
+            return _export_simdjson(_simdjson_parser().load(file_path))
+        
+        # Lecture du fichier en une fois puis parsing depuis les octets
+        # (évite le décodage incrémental de json.load sur un flux texte)
+        with open(file_path, 'rb', buffering=READ_BUFFER_SIZE) as f:
+            raw = f.read()
+        if orjson is not None:
+            return orjson.loads(raw)
+        return json.loads(raw)
     except FileNotFoundError:
         logger.error(f"Fichier non trouvé: {file_path}")
         return None
@@ -154,6 +448,41 @@ def load_json_from_file(file_path: str) -> Optional[Dict[str, Any]]:
         logger.error(f"Erreur lors du chargement du fichier {file_path}: {e}")
         return None
 
+def json_file_has_keys(file_path: str, required_keys: List[str]) -> bool:
+    """
+    Vérifie qu'un fichier JSON contient les clés de premier niveau requises
+    
+    Avec ijson, le fichier est lu en flux et la lecture s'arrête dès que
+    toutes les clés ont été vues ; sinon, le fichier est chargé entièrement.
+    
+    Args:
+        file_path: Chemin du fichier JSON
+        required_keys: Clés de premier niveau requises
+        
+    Returns:
+        True si toutes les clés sont présentes, False sinon
+    """
+    if ijson is None:
+        data = load_json_from_file(file_path)
+        return data is not None and validate_json_structure(data, required_keys)
+    
+    required = _required_key_set(tuple(required_keys))
+    if not required:
+        return True
+    
+    try:
+        seen = set()
+        with open(file_path, 'rb', buffering=READ_BUFFER_SIZE) as f:
+            for prefix, event, value in ijson.parse(f):
+                if event == 'map_key' and prefix == '':
+                    seen.add(value)
+                    if required <= seen:
+                        return True
+        return False
+    except Exception as e:
+        logger.error(f"Erreur lors de la vérification des clés de {file_path}: {e}")
+        return False
+
 def merge_json_objects(obj1: Dict[str, Any], obj2: Dict[str, Any]) -> Dict[str, Any]:
     """
     Fusionne deux objets JSON (obj2 écrase obj1 en cas de conflit)
@@ -165,8 +494,22 @@ def merge_json_objects(obj1: Dict[str, Any], obj2: Dict[str, Any]) -> Dict[str,
     Returns:
         Objet JSON fusionné
     """
-    result = obj1.copy()
-    result.update(obj2)
+    # Construction du dictionnaire fusionné en une seule passe (PEP 584)
+    return obj1 | obj2
+
+def merge_many(objects: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Fusionne plusieurs objets JSON (les derniers écrasent les premiers)
+    
+    Args:
+        objects: Objets JSON à fusionner, dans l'ordre
+        
+    Returns:
+        Objet JSON fusionné (un seul dictionnaire alloué)
+    """
+    result: Dict[str, Any] = {}
+    for obj in objects:
+        result.update(obj)
     return result
 
 def flatten_json(obj: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
@@ -182,12 +525,19 @@ def flatten_json(obj: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
     """
     flattened = {}
     
-    for key, value in obj.items():
-        new_key = f"{prefix}.{key}" if prefix else key
-        
-        if isinstance(value, dict):
-            flattened.update(flatten_json(value, new_key))
-        else:
+    # Parcours en profondeur sans récursion : une pile d'itérateurs (préfixe, items)
+    # conserve l'ordre des clés de la version récursive
+    stack = [(prefix, iter(obj.items()))]
+    while stack:
+        current_prefix, items = stack[-1]
+        for key, value in items:
+            new_key = f"{current_prefix}.{key}" if current_prefix else key
+            
+            if isinstance(value, dict):
+                stack.append((new_key, iter(value.items())))
+                break
             flattened[new_key] = value
+        else:
+            stack.pop()
     
     return flattened 
\ No newline at end of file
@@ -0,0 +1,84 @@
+"""
+Utilitaires pour la configuration des logs
+"""
+
+import logging
+import multiprocessing
+import sys
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# File d'attente et listener du processus principal (créés une seule fois)
+_log_queue: Optional[multiprocessing.Queue] = None
+_listener: Optional[QueueListener] = None
+
+def setup_logging(log_file: str = 'aor.log', level: int = logging.INFO) -> QueueListener:
+    """
+    Configure les logs de l'application via une file d'attente
+
+    Les enregistrements sont déposés dans une queue par le thread appelant
+    et écrits (fichier rotatif + console) par un thread d'arrière-plan.
+    La queue est partagée entre processus : les workers d'ingestion y
+    déposent leurs logs via worker_logging_initializer. Les appels suivants
+    retournent le listener déjà configuré.
+
+    Args:
+        log_file: Chemin du fichier de log
+        level: Niveau de log minimum
+
+    Returns:
+        Listener démarré, à arrêter avec .stop() en fin d'application
+    """
+    global _log_queue, _listener
+    if _listener is not None:
+        return _listener
+
+    formatter = logging.Formatter(LOG_FORMAT)
+
+    file_handler = RotatingFileHandler(log_file, maxBytes=10_000_000, backupCount=3, encoding='utf-8')
+    file_handler.setFormatter(formatter)
+
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setFormatter(formatter)
+
+    _log_queue = multiprocessing.Queue(-1)
+    _listener = QueueListener(_log_queue, file_handler, console_handler, respect_handler_level=True)
+
+    root_logger = logging.getLogger()
+    root_logger.setLevel(level)
+    root_logger.addHandler(QueueHandler(_log_queue))
+    _listener.start()
+
+    return _listener
+
+def get_log_queue() -> Optional[multiprocessing.Queue]:
+    """
+    Retourne la queue de logs du processus principal
+
+    Returns:
+        Queue lue par le listener, ou None si setup_logging n'a pas été appelé
+    """
+    return _log_queue
+
+def worker_logging_initializer(log_queue: Optional[multiprocessing.Queue], level: int = logging.INFO) -> None:
+    """
+    Redirige les logs d'un processus worker vers la queue du processus principal
+
+    À passer comme initializer d'un ProcessPoolExecutor : les handlers
+    hérités (fork) sont remplacés par un seul QueueHandler, de sorte que
+    seul le listener du processus principal écrit dans le fichier de log.
+
+    Args:
+        log_queue: Queue obtenue par get_log_queue() (None : logs inchangés)
+        level: Niveau de log minimum
+    """
+    if log_queue is None:
+        return
+
+    root_logger = logging.getLogger()
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+    root_logger.addHandler(QueueHandler(log_queue))
+    root_logger.setLevel(level)
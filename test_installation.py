@@ -6,6 +6,15 @@ Script de test pour valider l'installation AOR
 import sys
 import os
 import importlib
+from concurrent.futures import ThreadPoolExecutor
+
+def _try_import(module):
+    """Importe un module et indique si l'import a réussi"""
+    try:
+        importlib.import_module(module)
+        return module, True
+    except ImportError:
+        return module, False
 
 def test_imports():
     """Teste l'import des modules principaux"""
@@ -26,11 +35,15 @@ def test_imports():
     
     failed_imports = []
     
-    for module in modules_to_test:
-        try:
-            importlib.import_module(module)
+    # Imports en parallèle (lectures disque et chargement des extensions se recouvrent),
+    # résultats affichés dans l'ordre de la liste
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(_try_import, modules_to_test))
+    
+    for module, ok in results:
+        if ok:
             print(f"✅ {module}")
-        except ImportError:
+        else:
             print(f"❌ {module}")
             failed_imports.append(module)
     
@@ -61,10 +74,20 @@ def test_project_structure():
         'README.md'
     ]
     
+    # Un seul listage (scandir) par répertoire parent au lieu d'un stat() par fichier
+    present = set()
+    for directory in {os.path.dirname(file_path) for file_path in required_files}:
+        try:
+            with os.scandir(directory or '.') as entries:
+                # Clés construites avec '/' pour correspondre à required_files sous Windows
+                present.update(f"{directory}/{entry.name}" if directory else entry.name for entry in entries)
+        except OSError:
+            pass
+    
     missing_files = []
     
     for file_path in required_files:
-        if os.path.exists(file_path):
+        if file_path in present:
             print(f"✅ {file_path}")
         else:
             print(f"❌ {file_path}")